@@ -1,20 +1,140 @@
 import streamlit as st
-import chromadb
-from chromadb.utils import embedding_functions
-import PyPDF2
-import io
-import docx2txt
-from openai import OpenAI
-import json
-import re
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-
-# Initialize OpenAI client
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-
-# Initialize ChromaDB
-chroma_client = chromadb.PersistentClient(path="./chroma_db")
+import logging
+import zipfile
+from functools import partial
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from datetime import datetime
+from batch import DEFAULT_MAX_CONCURRENCY, call_with_retry, screen_jobs, screen_resume_packs, screen_resumes
+from candidate_store import RISK_LEVELS, make_document_id
+from documents import SUPPORTED_FILE_TYPES, extract_text
+from ingestion import iter_source, iter_zip_documents
+from job_queue import DEFAULT_WORKERS, DONE, FAILED, JobQueue, JobWorkerPool
+from llm_replay import DEFAULT_RECORDING_PATH
+from metrics import metrics, start_metrics_server
+from screening import (
+    JOB_HANDLERS, configure_client, configure_llm_mode, format_jd_profile, get_candidate_store, get_result_cache,
+    pack_resumes, request_jd_profile, request_job_match, request_packed_resume_jd_match, request_resume_jd_match
+)
+
+# Top-level sections of the eligibility response needed by each results tab
+ELIGIBILITY_TAB_SECTIONS = {
+    "Overall Assessment": ["overall_assessment"],
+    "Timeline Analysis": ["timeline_assessment"],
+    "Education & Background": ["eligibility_factors", "stem_qualification"],
+    "Action Items": ["overall_assessment", "eligibility_factors"]
+}
+
+# How often the page re-checks a running background analysis
+JOB_POLL_SECONDS = 1.0
+
+# Report prompt compaction and other pipeline details in the server log
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# The OpenAI client is created by screening on the first LLM call and shared process-wide;
+# chromadb and openai take about a second each to import, so neither is loaded at start-up
+configure_client(api_key=st.secrets.get("OPENAI_API_KEY"))
+# LLM_MODE = "replay" serves recorded LLM responses, so the app runs offline without an API key
+if st.secrets.get("LLM_MODE"):
+    configure_llm_mode(
+        st.secrets["LLM_MODE"],
+        st.secrets.get("LLM_RECORDING", DEFAULT_RECORDING_PATH),
+        float(st.secrets.get("REPLAY_LATENCY", 0))
+    )
+
+@st.cache_resource
+def get_chroma_client():
+    """Process-wide ChromaDB client, imported and opened the first time the resume index is used"""
+    import chromadb
+    
+    return chromadb.PersistentClient(path="./chroma_db")
+
+@st.cache_resource
+def get_resume_index():
+    """Chroma collection of ingested resumes used for the embedding pre-filter"""
+    from resume_index import get_resume_collection
+    
+    # "hash" runs fully offline; "sentence-transformer" uses a local embedding model
+    return get_resume_collection(get_chroma_client(), st.secrets.get("EMBEDDING_BACKEND", "hash"))
+
+@st.cache_resource
+def get_job_profile_index():
+    """Chroma collection of stored JD requirement profiles used to shortlist jobs for a resume"""
+    from resume_index import get_job_profile_collection
+    
+    return get_job_profile_collection(get_chroma_client(), st.secrets.get("EMBEDDING_BACKEND", "hash"))
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Persistent analysis job queue, with one worker pool per server process shared by all sessions"""
+    queue = JobQueue()
+    JobWorkerPool(queue, JOB_HANDLERS, workers=int(st.secrets.get("JOB_WORKERS", DEFAULT_WORKERS))).start()
+    return queue
+
+def poll_job(job_id: str, render_job: Callable[[Dict], None]):
+    """Render a background job, re-checking it every JOB_POLL_SECONDS until it finishes
+
+    Only the job's fragment reruns while polling, so the rest of the page stays
+    interactive and no script thread waits on the LLM.
+    """
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return
+    running = job["status"] not in (DONE, FAILED)
+    
+    @st.fragment(run_every=JOB_POLL_SECONDS if running else None)
+    def job_view():
+        current = get_job_queue().get(job_id)
+        render_job(current)
+        if running and current["status"] in (DONE, FAILED):
+            # Rerun the whole page so widgets outside the fragment see the result
+            st.rerun()
+    
+    job_view()
+
+def render_match_job(job: Dict):
+    """Show the status or result of a resume-JD match job"""
+    if job["status"] == FAILED:
+        st.error(f"Error in resume-JD analysis: {job['error']}")
+        return
+    if job["status"] != DONE:
+        st.info("Analyzing resume-job match... The analysis keeps running if you leave or reload this page.")
+        return
+    
+    if st.session_state.jd_analysis != job["result"]:
+        st.session_state.jd_analysis = job["result"]
+        st.session_state.jd_id = make_document_id(job["payload"]["jd_text"])
+        st.session_state.resume_name = job["payload"].get("candidate")
+    
+    with metrics.span("render", view="match_results"):
+        render_match_results(job["result"])
+
+def render_eligibility_job(job: Dict):
+    """Show the status of an H1B eligibility job, with its sections as they are generated"""
+    if job["status"] == FAILED:
+        st.error(f"Error in H1B eligibility analysis: {job['error']}")
+        return
+    if job["status"] != DONE:
+        st.info("Analyzing H1B eligibility... The analysis keeps running if you leave or reload this page.")
+    sections = job["result"] if job["status"] == DONE else job["partial"]
+    render_eligibility_stream(iter(sections.items()), complete=job["status"] == DONE)
+
+@st.cache_resource
+def start_metrics_endpoint(port: int):
+    """Expose Prometheus metrics on /metrics once per server process"""
+    return start_metrics_server(port)
+
+def render_debug_panel():
+    """Sidebar panel with per-stage latency, token usage and cache counters"""
+    if not st.sidebar.checkbox("Show debug metrics"):
+        return
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("Debug Metrics", expanded=True):
+        st.write("#### Stage Latency")
+        st.dataframe(snapshot["stages"], use_container_width=True)
+        st.write("#### Tokens & Cache")
+        st.dataframe(snapshot["counters"], use_container_width=True)
+        st.download_button("Download Prometheus Metrics", metrics.render_prometheus(), file_name="metrics.prom")
 
 def read_file_content(file) -> Optional[str]:
     """Read content from uploaded file"""
@@ -22,249 +142,511 @@ def read_file_content(file) -> Optional[str]:
         return None
         
     try:
-        file_type = file.name.split('.')[-1].lower()
-        
-        if file_type == 'pdf':
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-            return " ".join(page.extract_text() for page in pdf_reader.pages)
-        elif file_type == 'docx':
-            return docx2txt.process(io.BytesIO(file.read()))
-        elif file_type == 'txt':
-            return file.getvalue().decode('utf-8')
-        else:
-            st.error(f"Unsupported file type: {file_type}")
-            return None
-            
+        return extract_text(file.name, file.getvalue())
+    except ValueError as e:
+        st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return None
 
-def analyze_resume_jd_match(resume_text: str, jd_text: str) -> Dict:
-    """Analyze match between resume and job description"""
-    prompt = f"""
-    Analyze the match between this resume and job description.
-    
-    Job Description:
-    {jd_text}
-    
-    Resume:
-    {resume_text}
-    
-    Provide a JSON response with:
-    1. Match percentage (0-100)
-    2. Matching skills and qualifications
-    3. Missing requirements
-    4. Job title and level match
-    5. Required education level from JD
-    6. Industry alignment
-    
-    Format:
-    {{
-        "match_percentage": number,
-        "matching_skills": list,
-        "missing_requirements": list,
-        "job_title_match": boolean,
-        "required_education": string,
-        "industry_alignment": string,
-        "role_summary": string
-    }}
+def render_match_results(match_analysis: Dict):
+    """Render the resume-JD match analysis results"""
+    st.subheader("Match Analysis Results")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.metric("Overall Match", f"{match_analysis['match_percentage']}%")
+        st.write("### Matching Skills")
+        for skill in match_analysis['matching_skills']:
+            st.write(f"✓ {skill}")
+
+    with col2:
+        st.write("### Missing Requirements")
+        for req in match_analysis['missing_requirements']:
+            st.write(f"✗ {req}")
+
+    st.write(f"**Required Education:** {match_analysis['required_education']}")
+    st.write(f"**Industry Alignment:** {match_analysis['industry_alignment']}")
+
+    # Proceed to next step if match is acceptable
+    if match_analysis['match_percentage'] >= 50:
+        st.success("Match analysis complete! You can proceed to H1B eligibility assessment.")
+        if st.button("Proceed to H1B Assessment"):
+            st.session_state.step = 2
+            st.rerun()
+    else:
+        st.warning("The resume-job match is below 50%. Consider improving the match before proceeding with H1B assessment.")
+
+def render_overall_assessment(eligibility_analysis: Dict):
+    """Render the Overall Assessment tab"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(
+            "H1B Eligibility Confidence",
+            f"{eligibility_analysis['overall_assessment']['confidence_score']}%"
+        )
+        
+        risk_color = {
+            "LOW": "green",
+            "MEDIUM": "yellow",
+            "HIGH": "red"
+        }.get(eligibility_analysis['overall_assessment']['risk_level'], "gray")
+        
+        st.markdown(f"""
+            <div style='background-color: {risk_color}; padding: 10px; border-radius: 5px;'>
+                Risk Level: {eligibility_analysis['overall_assessment']['risk_level']}
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        if eligibility_analysis['overall_assessment']['eligible']:
+            st.success("Candidate appears eligible for H1B visa")
+        else:
+            st.error("Candidate may not meet H1B requirements")
+        
+        st.write("### Key Concerns")
+        for concern in eligibility_analysis['overall_assessment']['key_concerns']:
+            st.warning(f"⚠️ {concern}")
+
+def render_timeline_analysis(eligibility_analysis: Dict):
+    """Render the Timeline Analysis tab"""
+    st.write("### Visa Timeline")
+    timeline = eligibility_analysis['timeline_assessment']
+    
+    for deadline, date in timeline['upcoming_deadlines'].items():
+        st.write(f"**{deadline}:** {date}")
+    
+    st.write("### Immediate Actions Required")
+    for action in timeline['immediate_actions']:
+        st.write(f"• {action}")
+    
+    st.write("### Contingency Plans")
+    for plan in timeline['contingency_plans']:
+        st.write(f"📋 {plan}")
+
+def render_education_background(eligibility_analysis: Dict):
+    """Render the Education & Background tab"""
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("### Education Qualification")
+        st.metric(
+            "Education Match Score",
+            f"{eligibility_analysis['eligibility_factors']['education_qualification']['score']}%"
+        )
+        st.write(eligibility_analysis['eligibility_factors']['education_qualification']['analysis'])
+    
+    with col2:
+        st.write("### STEM Qualification")
+        if eligibility_analysis['stem_qualification']['eligible_for_stem_opt']:
+            st.success("Eligible for STEM OPT")
+        else:
+            st.error("Not eligible for STEM OPT")
+        
+        st.write("#### Benefits")
+        for benefit in eligibility_analysis['stem_qualification']['benefits']:
+            st.write(f"✓ {benefit}")
+
+def render_action_items(eligibility_analysis: Dict):
+    """Render the Action Items tab"""
+    st.write("### Recommendations")
+    for rec in eligibility_analysis['overall_assessment']['recommendations']:
+        st.write(f"• {rec}")
+    
+    if eligibility_analysis['eligibility_factors']['visa_timing']['risks']:
+        st.write("### Timeline Risks")
+        for risk in eligibility_analysis['eligibility_factors']['visa_timing']['risks']:
+            st.error(f"⚠️ {risk}")
+
+ELIGIBILITY_TAB_RENDERERS = {
+    "Overall Assessment": render_overall_assessment,
+    "Timeline Analysis": render_timeline_analysis,
+    "Education & Background": render_education_background,
+    "Action Items": render_action_items
+}
+
+def render_eligibility_stream(eligibility_stream: Iterator[Tuple[str, Any]], complete: bool = True) -> Dict:
+    """Render the eligibility tabs, filling each in as soon as the sections it needs arrive
+
+    With complete=False, tabs whose sections have not arrived yet keep waiting
+    instead of being reported as missing.
     """
+    # Create tabs for organized display
+    tabs = st.tabs(list(ELIGIBILITY_TAB_RENDERERS))
+    placeholders = {}
+    for tab, name in zip(tabs, ELIGIBILITY_TAB_RENDERERS):
+        with tab:
+            placeholders[name] = st.empty()
+            placeholders[name].info("Waiting for analysis...")
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert ATS system analyzer. Please assess the alignment between the skills in my resume and the job description. If specific skills do not directly match the job requirements, evaluate their relevance by checking if they fall under broader, related categories that still align with the role's core competencies. For example, skills in machine learning (ML) may fall under computer science (CS) and thus may be relevant for certain CS roles even if ML isn't specifically mentioned.  Apply a flexible but balanced approach in your analysis, where related skills under larger domains or fields should receive consideration, while still prioritizing direct matches to the job description requirements."},
-                {"role": "user", "content": prompt}
-            ]
+    eligibility_analysis = {}
+    pending = set(ELIGIBILITY_TAB_RENDERERS)
+    for key, value in eligibility_stream:
+        eligibility_analysis[key] = value
+        # A section can arrive again after a repair request, so re-render every tab that uses it
+        ready = [
+            name for name, sections in ELIGIBILITY_TAB_SECTIONS.items()
+            if key in sections and all(k in eligibility_analysis for k in sections)
+        ]
+        for name in ready:
+            with placeholders[name].container(), metrics.span("render", view=name):
+                ELIGIBILITY_TAB_RENDERERS[name](eligibility_analysis)
+            pending.discard(name)
+    
+    for name in pending if complete else []:
+        placeholders[name].warning("This section is missing from the analysis.")
+    return eligibility_analysis
+
+def render_batch_screening():
+    """Screen many resumes against a single job description"""
+    # Loads chromadb, so only sessions that open batch screening pay for it
+    from resume_index import DEFAULT_TOP_K, index_resumes, shortlist_resumes
+    
+    st.header("Batch Screening: Multiple Resumes Against One Job Description")
+    
+    jd_file = st.file_uploader("Upload Job Description", type=SUPPORTED_FILE_TYPES, key='batch_jd_upload')
+    
+    source = st.radio("Resume Source", ["Upload Files", "ZIP Archive", "Local Folder"], horizontal=True)
+    resume_files = []
+    resume_archive = None
+    resume_folder = ""
+    if source == "Upload Files":
+        resume_files = st.file_uploader(
+            "Upload Resumes",
+            type=SUPPORTED_FILE_TYPES,
+            accept_multiple_files=True,
+            key='batch_resume_upload'
+        )
+    elif source == "ZIP Archive":
+        resume_archive = st.file_uploader("Upload Resume Archive", type=['zip'], key='batch_archive_upload')
+    else:
+        resume_folder = st.text_input(
+            "Resume Folder Path",
+            help="Folder, ZIP archive or JSONL manifest of PDF, DOCX or TXT resumes"
         )
-        # st.write(response.choices[0].message.content)
-        return json.loads(response.choices[0].message.content)
     
+    max_concurrency = st.slider(
+        "Concurrent Analyses",
+        min_value=1,
+        max_value=32,
+        value=DEFAULT_MAX_CONCURRENCY,
+        help="Maximum number of LLM requests in flight at once"
+    )
+    
+    pack_requests = st.checkbox(
+        "Pack short resumes into shared requests",
+        help="Analyze several short resumes per LLM call to cut round trips and input tokens"
+    )
+    
+    use_prefilter = st.checkbox(
+        "Shortlist with embedding pre-filter",
+        value=True,
+        help="Only the resumes most similar to the job description are sent for full LLM analysis"
+    )
+    if use_prefilter:
+        top_k = st.number_input("Candidates to Shortlist", min_value=1, value=DEFAULT_TOP_K)
+        search_all = st.checkbox(
+            "Search all previously ingested resumes",
+            help="Shortlist from every indexed resume, not only the ones in this batch"
+        )
+    
+    if not jd_file or not (resume_files or resume_archive or resume_folder):
+        return
+    
+    if not st.button("Screen Candidates"):
+        return
+    
+    jd_text = read_file_content(jd_file)
+    if not jd_text:
+        return
+    
+    # The JD is analyzed once up front; every candidate is matched against this profile
+    try:
+        with st.spinner("Analyzing job description..."):
+            jd_profile = call_with_retry(request_jd_profile, jd_text, get_result_cache())
     except Exception as e:
-        st.error(f"Error in resume-JD analysis: {str(e)}")
-        return None
+        st.error(f"Error in job description analysis: {str(e)}")
+        return
+    with st.expander("Job Requirement Profile"):
+        st.json(jd_profile)
+    
+    resumes = {}
+    failed = []
+    try:
+        # Archives and folders are read one document at a time rather than loaded whole
+        if resume_files:
+            documents = ((f.name, f.getvalue()) for f in resume_files)
+        elif resume_archive:
+            documents = ((d.name, d.read()) for d in iter_zip_documents(resume_archive))
+        else:
+            documents = ((d.name, d.read()) for d in iter_source(resume_folder))
+        for name, data in documents:
+            try:
+                resumes[name] = extract_text(name, data)
+            except Exception as e:
+                failed.append({"candidate": name, "error": f"Error reading file: {str(e)}"})
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        st.error(f"Error reading resumes: {str(e)}")
+        return
+    
+    if not resumes:
+        st.warning("No readable resumes found.")
+        return
+    
+    store = get_candidate_store()
+    jd_id = store.add_job(jd_text, jd_file.name, profile=jd_profile)
+    
+    resume_index = get_resume_index()
+    resume_ids = index_resumes(resume_index, resumes)
+    similarities = {}
+    if use_prefilter:
+        shortlist = shortlist_resumes(
+            resume_index,
+            jd_text,
+            top_k=int(top_k),
+            resume_ids=None if search_all else list(resume_ids.values())
+        )
+        resumes = {item["candidate"]: item["resume_text"] for item in shortlist}
+        similarities = {item["candidate"]: item["similarity"] for item in shortlist}
+        st.info(f"Shortlisted {len(resumes)} candidates by similarity to the job description.")
+    
+    # Candidates already scored against this JD with the same resume are not sent to the LLM again
+    scored = store.get_scored_resumes(jd_id)
+    stored_results = [
+        {"candidate": name, "analysis": store.get_candidate(jd_id, name)["jd_analysis"], "error": None}
+        for name, text in resumes.items()
+        if scored.get(name) == make_document_id(text)
+    ]
+    pending = {name: text for name, text in resumes.items() if name not in {r["candidate"] for r in stored_results}}
+    if stored_results:
+        st.info(f"Reusing stored results for {len(stored_results)} previously scored candidates.")
+    
+    progress = st.progress(0.0, text=f"Screening 0 of {len(resumes)} candidates...")
+    table = st.empty()
+    rows = []
+    
+    if pack_requests:
+        analyze_fn = partial(request_packed_resume_jd_match, cache=get_result_cache(), jd_profile=jd_profile)
+        screened = screen_resume_packs(pack_resumes(pending), jd_text, analyze_fn, max_concurrency=max_concurrency)
+    else:
+        analyze_fn = partial(request_resume_jd_match, cache=get_result_cache(), jd_profile=jd_profile)
+        screened = screen_resumes(pending, jd_text, analyze_fn, max_concurrency=max_concurrency)
+    results = chain(stored_results, screened)
+    for done, result in enumerate(results, start=1):
+        analysis = result["analysis"] or {}
+        if result["analysis"] and result["candidate"] in pending:
+            store.save_match(jd_id, result["candidate"], pending[result["candidate"]], result["analysis"])
+        rows.append({
+            "Candidate": result["candidate"],
+            "Similarity": round(similarities[result["candidate"]], 3) if result["candidate"] in similarities else None,
+            "Match %": analysis.get("match_percentage"),
+            "Title Match": analysis.get("job_title_match"),
+            "Matching Skills": ", ".join(analysis.get("matching_skills", [])),
+            "Missing Requirements": ", ".join(analysis.get("missing_requirements", [])),
+            "Error": result["error"]
+        })
+        progress.progress(done / len(resumes), text=f"Screening {done} of {len(resumes)} candidates...")
+        table.dataframe(
+            sorted(rows, key=lambda r: r["Match %"] or 0, reverse=True),
+            use_container_width=True
+        )
+    
+    progress.empty()
+    st.success(f"Screened {len(resumes)} candidates. See the Leaderboard for the ranking across all runs.")
+    for failure in failed:
+        st.error(f"{failure['candidate']}: {failure['error']}")
 
-def calculate_visa_timeline(visa_status: str, start_date: datetime, end_date: Optional[datetime]) -> Dict:
-    """Calculate visa timeline and key dates"""
-    today = datetime.now()
-    next_h1b_window = datetime(today.year + (1 if today.month >= 4 else 0), 1, 15)  # Jan 15th next year
-    h1b_results_date = datetime(next_h1b_window.year, 4, 15)  # April 15th of application year
-    
-    timeline = {
-        "current_status": visa_status,
-        "days_remaining": None,
-        "needs_immediate_action": False,
-        "next_h1b_window": next_h1b_window.strftime("%Y-%m-%d"),
-        "results_date": h1b_results_date.strftime("%Y-%m-%d"),
-        "recommended_action": "",
-        "risk_level": "LOW"
-    }
-    
-    if end_date:
-        days_remaining = (end_date - today).days
-        timeline["days_remaining"] = days_remaining
-        
-        # Calculate hiring window consideration
-        hiring_window = timedelta(days=30)
-        effective_deadline = end_date - hiring_window
-        
-        if visa_status == "F1 - OPT":
-            if days_remaining < 90:
-                timeline["risk_level"] = "HIGH"
-                timeline["needs_immediate_action"] = True
-                timeline["recommended_action"] = "Immediate action required - OPT expiring soon"
-        elif visa_status == "STEM OPT":
-            if days_remaining < 180:
-                timeline["risk_level"] = "MEDIUM"
-                timeline["recommended_action"] = "Start preparing for H1B application"
-        elif visa_status == "H1B":
-            if days_remaining < 365:
-                timeline["risk_level"] = "MEDIUM"
-                timeline["recommended_action"] = "Consider H1B extension preparation"
-    
-    return timeline
-
-def analyze_h1b_eligibility(
-    transcript_text: str,
-    jd_analysis: Dict,
-    visa_status: str,
-    is_stem_degree: bool,
-    visa_start_date: datetime,
-    visa_end_date: Optional[datetime],
-    criminal_history: Dict
-) -> Dict:
-    """Enhanced H1B eligibility analysis considering additional factors"""
-    
-    # Calculate visa timeline
-    timeline = calculate_visa_timeline(visa_status, visa_start_date, visa_end_date)
-    
-    # Extract key information from JD analysis
-    match_percentage = jd_analysis.get('match_percentage', 0)
-    matching_skills = jd_analysis.get('matching_skills', [])
-    missing_requirements = jd_analysis.get('missing_requirements', [])
-    required_education = jd_analysis.get('required_education', '')
-    industry_alignment = jd_analysis.get('industry_alignment', '')
-    
-    prompt = """Please analyze the H1B visa eligibility based on the provided information. 
-    Consider both the candidate's qualifications and the job match analysis.
-    Respond ONLY with a JSON object containing the analysis results. 
-
-    Job Match Analysis Summary:
-    - Overall Match: {}%
-    - Matching Skills: {}
-    - Missing Requirements: {}
-    - Required Education: {}
-    - Industry Alignment: {}
-
-    Consider these factors in your analysis:
-    1. If match percentage is below 65%, this indicates higher risk for H1B approval
-    2. Missing requirements could affect specialty occupation qualification
-    3. Education alignment is crucial for H1B qualification
-    4. Industry alignment affects specialty occupation determination
-
-    Return a JSON object with the following structure:
-    {{
-        "eligibility_factors": {{
-            "education_qualification": {{
-                "score": <number 0-100>,
-                "analysis": <string explaining education match considering both transcript and job requirements>,
-                "risks": [<string>]
-            }},
-            "job_match_assessment": {{
-                "score": {},
-                "critical_gaps": [<string>],
-                "impact_on_h1b": <string explaining how job match affects H1B chances>
-            }},
-            "visa_timing": {{
-                "score": <number 0-100>,
-                "analysis": <string>,
-                "key_dates": {{
-                    "h1b_window_start": <string date>,
-                    "h1b_window_end": <string date>
-                }},
-                "risks": [<string>]
-            }},
-            "background_check": {{
-                "status": <string>,
-                "concerns": [<string>],
-                "impact": <string>
-            }}
-        }},
-        "specialty_occupation_assessment": {{
-            "qualifies": <boolean>,
-            "supporting_factors": [<string>],
-            "risk_factors": [<string>],
-            "job_skill_alignment": <string explaining how matching/missing skills affect specialty occupation qualification>
-        }},
-        "stem_qualification": {{
-            "eligible_for_stem_opt": <boolean>,
-            "benefits": [<string>],
-            "recommendations": [<string>]
-        }},
-        "timeline_assessment": {{
-            "immediate_actions": [<string>],
-            "upcoming_deadlines": {{
-                "next_h1b_filing": <string date>,
-                "current_status_expiry": <string date>
-            }},
-            "contingency_plans": [<string>]
-        }},
-        "overall_assessment": {{
-            "eligible": <boolean>,
-            "confidence_score": <number 0-100, heavily weighted by job match percentage>,
-            "risk_level": <string: "LOW"|"MEDIUM"|"HIGH">,
-            "key_concerns": [<string>],
-            "recommendations": [<string>]
-        }}
-    }}
-
-    Input Information:
-    """.format(
-        match_percentage,
-        ", ".join(matching_skills),
-        ", ".join(missing_requirements),
-        required_education,
-        industry_alignment,
-        match_percentage
+def render_job_fanout():
+    """Match one resume against the stored jobs it is most similar to"""
+    from resume_index import DEFAULT_TOP_K_JOBS, index_job_profiles, shortlist_jobs
+    
+    st.header("Match Across Jobs: One Resume Against Many Job Descriptions")
+    
+    resume_file = st.file_uploader("Upload Resume", type=SUPPORTED_FILE_TYPES, key='fanout_resume_upload')
+    jd_files = st.file_uploader(
+        "Add Job Descriptions",
+        type=SUPPORTED_FILE_TYPES,
+        accept_multiple_files=True,
+        key='fanout_jd_upload',
+        help="Optional; every job already screened in this app is searched as well"
     )
     
-    # Add remaining input information
-    prompt += """
-    Current Visa Status: """ + visa_status + """
-    STEM Degree: """ + ("Yes" if is_stem_degree else "No") + """
-    Visa Timeline: """ + json.dumps(timeline) + """
-    Criminal History: """ + json.dumps(criminal_history) + """
-    Transcript: """ + transcript_text + """
-    """
+    col1, col2 = st.columns(2)
+    with col1:
+        top_k = st.number_input(
+            "Jobs to Shortlist",
+            min_value=1,
+            value=DEFAULT_TOP_K_JOBS,
+            help="Jobs ranked by embedding similarity between the resume and their requirement profiles"
+        )
+    with col2:
+        top_n = st.number_input(
+            "Detailed Matches",
+            min_value=1,
+            value=3,
+            help="Only this many of the shortlisted jobs get a full LLM match analysis"
+        )
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": """You are an expert H1B visa analyst. 
-                Consider both candidate qualifications and job match for H1B eligibility.
-                A strong job match (>65%) significantly improves H1B chances.
-                Missing job requirements or poor skill match increases H1B denial risk.
-                A person with criminal history is mostly likely not going to get H1B. many more supporting would be required to assess the crime.
-                Always respond with ONLY a valid JSON object matching the specified structure."""},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
+    if not resume_file or not st.button("Match Jobs"):
+        return
+    
+    resume_text = read_file_content(resume_file)
+    if not resume_text:
+        return
+    
+    store = get_candidate_store()
+    # New JDs are profiled once (and cached by content) so later resumes are matched against them for free
+    for jd_file in jd_files or []:
+        jd_text = read_file_content(jd_file)
+        if not jd_text:
+            continue
+        try:
+            with st.spinner(f"Analyzing {jd_file.name}..."):
+                jd_profile = call_with_retry(request_jd_profile, jd_text, get_result_cache())
+        except Exception as e:
+            st.error(f"Error in job description analysis for {jd_file.name}: {str(e)}")
+            continue
+        store.add_job(jd_text, jd_file.name, profile=jd_profile)
+    
+    jobs = {job["jd_id"]: job for job in store.list_job_profiles()}
+    if not jobs:
+        st.info("No job descriptions with a requirement profile yet. Add some above or screen candidates first.")
+        return
+    
+    job_index = get_job_profile_index()
+    index_job_profiles(job_index, list(jobs.values()), format_jd_profile)
+    shortlist = shortlist_jobs(job_index, resume_text, top_k=int(top_k), jd_ids=list(jobs))
+    st.info(f"Shortlisted {len(shortlist)} of {len(jobs)} jobs by similarity to the resume.")
+    
+    detailed = [dict(jobs[item["jd_id"]], similarity=item["similarity"]) for item in shortlist[:int(top_n)]]
+    progress = st.progress(0.0, text=f"Matching 0 of {len(detailed)} jobs...")
+    table = st.empty()
+    rows = []
+    analyze_fn = partial(request_job_match, cache=get_result_cache())
+    for done, result in enumerate(screen_jobs(resume_text, detailed, analyze_fn), start=1):
+        analysis = result["analysis"] or {}
+        if result["analysis"]:
+            store.save_match(result["jd_id"], resume_file.name, resume_text, result["analysis"])
+        rows.append({
+            "Job": result["title"],
+            "Similarity": round(result["similarity"], 3),
+            "Match %": analysis.get("match_percentage"),
+            "Title Match": analysis.get("job_title_match"),
+            "Matching Skills": ", ".join(analysis.get("matching_skills", [])),
+            "Missing Requirements": ", ".join(analysis.get("missing_requirements", [])),
+            "Error": result["error"]
+        })
+        progress.progress(done / len(detailed), text=f"Matching {done} of {len(detailed)} jobs...")
+        table.dataframe(
+            sorted(rows, key=lambda r: r["Match %"] or 0, reverse=True),
+            use_container_width=True,
+            hide_index=True
         )
+    progress.empty()
+    
+    remaining = shortlist[int(top_n):]
+    if remaining:
+        with st.expander(f"Other Shortlisted Jobs ({len(remaining)}, similarity only)"):
+            st.dataframe(
+                [{"Job": item["title"], "Similarity": round(item["similarity"], 3)} for item in remaining],
+                use_container_width=True,
+                hide_index=True
+            )
+
+def render_outcome_calibration():
+    """Import historical outcomes and refit the approval probability calibration"""
+    from outcomes import MIN_TRAINING_OUTCOMES, OutcomeStore, fit_calibration
+    
+    with st.expander("Historical Outcomes & Calibration"):
+        st.write(
+            "Upload past assessments with their real outcomes (CSV or Parquet with `confidence_score`, "
+            "`match_percentage`, `is_stem_degree`, `visa_status` and `outcome` = APPROVED, RFE or DENIED)."
+        )
+        outcome_store = OutcomeStore()
+        outcome_file = st.file_uploader("Outcome File", type=['csv', 'parquet'], key='outcome_upload')
+        if outcome_file and st.button("Import Outcomes"):
+            try:
+                total = outcome_store.import_file(outcome_file)
+                st.success(f"Outcome store now holds {total} outcomes.")
+            except Exception as e:
+                st.error(f"Error importing outcomes: {str(e)}")
         
-        json_str = response.choices[0].message.content.strip()
-        json_str = json_str.replace('```json', '').replace('```', '').strip()
-        
-        return json.loads(json_str)
-        
-    except json.JSONDecodeError as e:
-        st.error(f"Error parsing JSON response: {str(e)}")
-        st.error("Raw response: " + response.choices[0].message.content)
-        return None
-    except Exception as e:
-        st.error(f"Error in H1B eligibility analysis: {str(e)}")
-        return None
+        if st.button("Fit Calibration", help=f"Needs at least {MIN_TRAINING_OUTCOMES} outcomes"):
+            try:
+                fit_calibration(outcome_store.load()).save()
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.rerun()
+
+def render_leaderboard():
+    """Rank every stored candidate for a job description"""
+    st.header("Candidate Leaderboard")
+    
+    store = get_candidate_store()
+    jobs = store.list_jobs()
+    if not jobs:
+        st.info("No screened candidates yet. Run a single or batch screening first.")
+        return
+    
+    job = st.selectbox(
+        "Job Description",
+        jobs,
+        format_func=lambda j: f"{j['title']} ({j['candidates']} candidates)"
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        min_match = st.slider("Minimum Match %", min_value=0, max_value=100, value=0)
+    with col2:
+        risk_levels = st.multiselect("Risk Level", RISK_LEVELS, help="Only candidates with an eligibility assessment have a risk level")
+    with col3:
+        limit = st.number_input("Candidates to Show", min_value=10, max_value=5000, value=100, step=10)
+    assessed_only = st.checkbox("Only candidates with an H1B eligibility assessment")
+    
+    rows = store.leaderboard(
+        job["jd_id"],
+        min_match=min_match or None,
+        risk_levels=risk_levels,
+        assessed_only=assessed_only,
+        limit=int(limit)
+    )
+    # pandas is only needed here, so it is imported with the calibration module on first use
+    import pandas as pd
+    from outcomes import Calibration
+    
+    calibration = Calibration.load()
+    # Every shown candidate is scored in one vectorized pass
+    approval = calibration.predict(pd.DataFrame(rows)) if calibration and rows else [None] * len(rows)
+    st.dataframe(
+        [
+            {
+                "Rank": rank,
+                "Candidate": row["candidate"],
+                "Score": row["rank_score"],
+                "Match %": row["match_percentage"],
+                "Confidence": row["confidence_score"],
+                "Approval %": None if probability is None else round(float(probability) * 100, 1),
+                "Risk Level": row["risk_level"],
+                "Eligible": None if row["eligible"] is None else bool(row["eligible"]),
+                "Updated": datetime.fromtimestamp(row["updated_at"]).strftime("%Y-%m-%d %H:%M")
+            }
+            for rank, (row, probability) in enumerate(zip(rows, approval), start=1)
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("Score = 50% match percentage + 30% eligibility confidence + 20% risk level (LOW 100, MEDIUM 50, HIGH 0).")
+    if calibration:
+        st.caption(
+            f"Approval % is calibrated on {calibration.metrics.get('trained_on', 0)} past outcomes "
+            "from the LLM confidence, match percentage, STEM degree and visa status "
+            f"(Brier score {calibration.metrics.get('brier_raw', 0):.3f} raw, "
+            f"{calibration.metrics.get('brier_calibrated', 0):.3f} calibrated)."
+        )
+    render_outcome_calibration()
 
 def main():
     st.set_page_config(page_title="H1B Eligibility Assessment", layout="wide")
@@ -280,6 +662,28 @@ def main():
     if 'resume_text' not in st.session_state:
         st.session_state.resume_text = None
     
+    # Background job ids are mirrored in the URL so a reloaded page picks its analyses back up
+    for job_key in ('match_job', 'eligibility_job'):
+        if job_key not in st.session_state:
+            st.session_state[job_key] = st.query_params.get(job_key)
+    
+    if st.secrets.get("METRICS_PORT"):
+        start_metrics_endpoint(int(st.secrets["METRICS_PORT"]))
+    
+    mode = st.sidebar.radio("Mode", ["Single Candidate", "Batch Screening", "Match Across Jobs", "Leaderboard"])
+    if mode == "Batch Screening":
+        render_batch_screening()
+        render_debug_panel()
+        return
+    if mode == "Match Across Jobs":
+        render_job_fanout()
+        render_debug_panel()
+        return
+    if mode == "Leaderboard":
+        render_leaderboard()
+        render_debug_panel()
+        return
+    
     # Step 1: Resume-JD Match Analysis
     if st.session_state.step == 1:
         st.header("Step 1: Resume-Job Description Match Analysis")
@@ -292,6 +696,7 @@ def main():
             if jd_file:
                 jd_text = read_file_content(jd_file)
                 st.session_state.jd_text = jd_text
+                st.session_state.jd_name = jd_file.name
                 if jd_text and st.checkbox("Show JD Content"):
                     st.text_area("JD Content", jd_text, height=200)
         
@@ -301,47 +706,29 @@ def main():
             if resume_file:
                 resume_text = read_file_content(resume_file)
                 st.session_state.resume_text = resume_text
+                st.session_state.resume_name = resume_file.name
+                if resume_text and st.session_state.get('indexed_resume') != resume_file.file_id:
+                    from resume_index import index_resumes
+                    index_resumes(get_resume_index(), {resume_file.name: resume_text})
+                    st.session_state.indexed_resume = resume_file.file_id
                 if resume_text and st.checkbox("Show Resume Content"):
                     st.text_area("Resume Content", resume_text, height=200)
         
         if st.session_state.jd_text and st.session_state.resume_text:
             if st.button("Analyze Resume-JD Match"):
-                with st.spinner("Analyzing resume-job match..."):
-                    match_analysis = analyze_resume_jd_match(
-                        st.session_state.resume_text, 
-                        st.session_state.jd_text
-                    )
-                    
-                    if match_analysis:
-                        st.session_state.jd_analysis = match_analysis
-                        
-                        # Display match results
-                        st.subheader("Match Analysis Results")
-                        
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.metric("Overall Match", f"{match_analysis['match_percentage']}%")
-                            st.write("### Matching Skills")
-                            for skill in match_analysis['matching_skills']:
-                                st.write(f"✓ {skill}")
-                        
-                        with col2:
-                            st.write("### Missing Requirements")
-                            for req in match_analysis['missing_requirements']:
-                                st.write(f"✗ {req}")
-                        
-                        st.write(f"**Required Education:** {match_analysis['required_education']}")
-                        st.write(f"**Industry Alignment:** {match_analysis['industry_alignment']}")
-                        
-                        # Proceed to next step if match is acceptable
-                        if match_analysis['match_percentage'] >= 50:
-                            st.success("Match analysis complete! You can proceed to H1B eligibility assessment.")
-                            if st.button("Proceed to H1B Assessment"):
-                                st.session_state.step = 2
-                                st.rerun()
-                        else:
-                            st.warning("The resume-job match is below 50%. Consider improving the match before proceeding with H1B assessment.")
+                # The worker also saves the result so the candidate shows up on the leaderboard
+                st.session_state.match_job = get_job_queue().submit("resume_jd_match", {
+                    "resume_text": st.session_state.resume_text,
+                    "jd_text": st.session_state.jd_text,
+                    "candidate": st.session_state.resume_name,
+                    "jd_name": st.session_state.jd_name
+                })
+                st.query_params["match_job"] = st.session_state.match_job
+                st.session_state.eligibility_job = None
+                st.query_params.pop("eligibility_job", None)
+        
+        if st.session_state.match_job:
+            poll_job(st.session_state.match_job, render_match_job)
     
     # Step 2: H1B Eligibility Assessment
     if True:
@@ -398,121 +785,35 @@ def main():
             transcript_text = read_file_content(transcript_file)
             
             if st.button("Assess H1B Eligibility"):
-                with st.spinner("Analyzing H1B eligibility..."):
-                    # Prepare criminal history data
-                    criminal_history = {
-                        "has_history": has_criminal_history == "Yes",
-                        "details": criminal_details if has_criminal_history == "Yes" else None
-                    }
-                    
-                    # Convert dates to datetime
-                    start_date = datetime.combine(visa_start, datetime.min.time()) if visa_status != "F1" else None
-                    end_date = datetime.combine(visa_end, datetime.min.time()) if visa_status != "F1" else None
-                    
-                    eligibility_analysis = analyze_h1b_eligibility(
-                        transcript_text,
-                        st.session_state.jd_analysis,
-                        visa_status,
-                        is_stem_degree == "Yes",
-                        start_date,
-                        end_date,
-                        criminal_history
-                    )
-                    
-                    if eligibility_analysis:
-                        # Create tabs for organized display
-                        tabs = st.tabs([
-                            "Overall Assessment",
-                            "Timeline Analysis",
-                            "Education & Background",
-                            "Action Items"
-                        ])
-                        
-                        with tabs[0]:
-                            # Overall Assessment
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.metric(
-                                    "H1B Eligibility Confidence",
-                                    f"{eligibility_analysis['overall_assessment']['confidence_score']}%"
-                                )
-                                
-                                risk_color = {
-                                    "LOW": "green",
-                                    "MEDIUM": "yellow",
-                                    "HIGH": "red"
-                                }.get(eligibility_analysis['overall_assessment']['risk_level'], "gray")
-                                
-                                st.markdown(f"""
-                                    <div style='background-color: {risk_color}; padding: 10px; border-radius: 5px;'>
-                                        Risk Level: {eligibility_analysis['overall_assessment']['risk_level']}
-                                    </div>
-                                """, unsafe_allow_html=True)
-                            
-                            with col2:
-                                if eligibility_analysis['overall_assessment']['eligible']:
-                                    st.success("Candidate appears eligible for H1B visa")
-                                else:
-                                    st.error("Candidate may not meet H1B requirements")
-                                
-                                st.write("### Key Concerns")
-                                for concern in eligibility_analysis['overall_assessment']['key_concerns']:
-                                    st.warning(f"⚠️ {concern}")
-                        
-                        with tabs[1]:
-                            # Timeline Analysis
-                            st.write("### Visa Timeline")
-                            timeline = eligibility_analysis['timeline_assessment']
-                            
-                            for deadline, date in timeline['upcoming_deadlines'].items():
-                                st.write(f"**{deadline}:** {date}")
-                            
-                            st.write("### Immediate Actions Required")
-                            for action in timeline['immediate_actions']:
-                                st.write(f"• {action}")
-                            
-                            st.write("### Contingency Plans")
-                            for plan in timeline['contingency_plans']:
-                                st.write(f"📋 {plan}")
-                        
-                        with tabs[2]:
-                            # Education & Background
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                st.write("### Education Qualification")
-                                st.metric(
-                                    "Education Match Score",
-                                    f"{eligibility_analysis['eligibility_factors']['education_qualification']['score']}%"
-                                )
-                                st.write(eligibility_analysis['eligibility_factors']['education_qualification']['analysis'])
-                            
-                            with col2:
-                                st.write("### STEM Qualification")
-                                if eligibility_analysis['stem_qualification']['eligible_for_stem_opt']:
-                                    st.success("Eligible for STEM OPT")
-                                else:
-                                    st.error("Not eligible for STEM OPT")
-                                
-                                st.write("#### Benefits")
-                                for benefit in eligibility_analysis['stem_qualification']['benefits']:
-                                    st.write(f"✓ {benefit}")
-                        
-                        with tabs[3]:
-                            # Action Items
-                            st.write("### Recommendations")
-                            for rec in eligibility_analysis['overall_assessment']['recommendations']:
-                                st.write(f"• {rec}")
-                            
-                            if eligibility_analysis['eligibility_factors']['visa_timing']['risks']:
-                                st.write("### Timeline Risks")
-                                for risk in eligibility_analysis['eligibility_factors']['visa_timing']['risks']:
-                                    st.error(f"⚠️ {risk}")
+                # Prepare criminal history data
+                criminal_history = {
+                    "has_history": has_criminal_history == "Yes",
+                    "details": criminal_details if has_criminal_history == "Yes" else None
+                }
+                
+                # Dates travel as ISO strings in the job payload
+                st.session_state.eligibility_job = get_job_queue().submit("h1b_eligibility", {
+                    "transcript_text": transcript_text,
+                    "jd_analysis": st.session_state.jd_analysis,
+                    "visa_status": visa_status,
+                    "is_stem_degree": is_stem_degree == "Yes",
+                    "visa_start_date": visa_start.isoformat() if visa_status != "F1" else None,
+                    "visa_end_date": visa_end.isoformat() if visa_status != "F1" else None,
+                    "criminal_history": criminal_history,
+                    "jd_id": st.session_state.get('jd_id'),
+                    "candidate": st.session_state.get('resume_name')
+                })
+                st.query_params["eligibility_job"] = st.session_state.eligibility_job
+        
+        if st.session_state.eligibility_job:
+            poll_job(st.session_state.eligibility_job, render_eligibility_job)
         
         # Option to go back
         if st.button("Back to Resume-JD Analysis"):
             st.session_state.step = 1
             st.rerun()
+    
+    render_debug_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,146 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# Error types raised by the OpenAI client that are worth retrying
+RETRYABLE_ERROR_NAMES = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError"}
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Check whether an LLM call failed because of rate limiting or a transient server problem"""
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Read the server-suggested wait time from a rate limit response, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retry(
+    func: Callable,
+    *args,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    **kwargs
+):
+    """Call func, retrying retryable errors with exponential backoff and full jitter"""
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = get_retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            time.sleep(min(delay, max_delay))
+            attempt += 1
+
+
+def screen_resumes(
+    resumes: Dict[str, str],
+    jd_text: str,
+    analyze_fn: Callable[[str, str], Dict],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> Iterator[Dict]:
+    """Analyze many resumes against one JD concurrently, yielding each result as it finishes
+
+    analyze_fn(resume_text, jd_text) must raise on failure so that rate limit
+    errors can be retried. Each yielded item has the keys "candidate",
+    "analysis" and "error".
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    try:
+        futures = {
+            executor.submit(call_with_retry, analyze_fn, resume_text, jd_text, max_retries=max_retries): candidate
+            for candidate, resume_text in resumes.items()
+        }
+        for future in as_completed(futures):
+            candidate = futures[future]
+            try:
+                yield {"candidate": candidate, "analysis": future.result(), "error": None}
+            except Exception as e:
+                yield {"candidate": candidate, "analysis": None, "error": str(e)}
+    finally:
+        # Drop queued work if the caller stops consuming early (e.g. a Streamlit rerun)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def screen_resume_packs(
+    packs: List[Dict[str, str]],
+    jd_text: str,
+    analyze_pack_fn: Callable[[Dict[str, str], str], Dict[str, Dict]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> Iterator[Dict]:
+    """Like screen_resumes, but each LLM call analyzes a pack of several resumes
+
+    analyze_pack_fn(resumes, jd_text) returns {candidate: analysis} for every
+    candidate in the pack and must raise on failure. Results are still yielded
+    one candidate at a time with the keys "candidate", "analysis" and "error".
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    try:
+        futures = {
+            executor.submit(call_with_retry, analyze_pack_fn, pack, jd_text, max_retries=max_retries): pack
+            for pack in packs
+        }
+        for future in as_completed(futures):
+            pack = futures[future]
+            try:
+                analyses = future.result()
+            except Exception as e:
+                for candidate in pack:
+                    yield {"candidate": candidate, "analysis": None, "error": str(e)}
+                continue
+            for candidate in pack:
+                yield {"candidate": candidate, "analysis": analyses[candidate], "error": None}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def screen_jobs(
+    resume_text: str,
+    jobs: List[Dict],
+    analyze_fn: Callable[[str, Dict], Dict],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> Iterator[Dict]:
+    """Analyze one resume against several jobs concurrently, yielding each result as it finishes
+
+    analyze_fn(resume_text, job) must raise on failure. Each yielded item is
+    the job dict with the keys "analysis" and "error" added.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    try:
+        futures = {
+            executor.submit(call_with_retry, analyze_fn, resume_text, job, max_retries=max_retries): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                yield dict(job, analysis=future.result(), error=None)
+            except Exception as e:
+                yield dict(job, analysis=None, error=str(e))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,163 @@
+"""Measure app cold-start and rerun time against a budget.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+
+    python benchmarks/cold_start.py --reruns 20 --cold-budget-ms 1500 --rerun-budget-ms 100
+
+Reports the import time of each heavy dependency, the time from process
+start to the first rendered page (Streamlit import plus the first script
+run), and p50/p95 of warm reruns. The first page must not load the modules
+in DEFERRED_MODULES. Exits with status 1 when a budget is exceeded.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+HEAVY_MODULES = ["streamlit", "openai", "chromadb", "numpy", "pandas", "PyPDF2", "docx2txt", "tiktoken"]
+# Only loaded once an analysis, upload, batch screening or the leaderboard needs them
+DEFERRED_MODULES = ["openai", "chromadb", "pandas", "PyPDF2", "docx2txt", "tiktoken"]
+
+DEFAULT_COLD_BUDGET_MS = 1500
+DEFAULT_RERUN_BUDGET_MS = 100
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_import(module: str, repeat: int) -> Optional[float]:
+    """Median milliseconds to import a module in a fresh interpreter, or None if it is not installed"""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+    )
+    samples = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if completed.returncode != 0:
+            return None
+        samples.append(float(completed.stdout.strip()))
+    return statistics.median(samples)
+
+
+def run_app(reruns: int) -> Dict:
+    """Render the app's first page in this process and time it; runs inside a fresh interpreter"""
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_ms = (time.perf_counter() - start) * 1000
+    sys.path.insert(0, REPO_ROOT)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = "cold-start"
+    at.run()
+    first_run_ms = (time.perf_counter() - start) * 1000 - streamlit_ms
+    cold_start_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f"App raised on first run: {at.exception[0].value}")
+    loaded = [module for module in DEFERRED_MODULES if module in sys.modules]
+
+    rerun_ms = []
+    for _ in range(reruns):
+        rerun_start = time.perf_counter()
+        at.run()
+        rerun_ms.append((time.perf_counter() - rerun_start) * 1000)
+
+    return {
+        "streamlit_import_ms": streamlit_ms,
+        "first_run_ms": first_run_ms,
+        "cold_start_ms": cold_start_ms,
+        "rerun_p50_ms": percentile(rerun_ms, 50),
+        "rerun_p95_ms": percentile(rerun_ms, 95),
+        "deferred_modules_loaded": loaded,
+    }
+
+
+def measure_app(reruns: int, repeat: int) -> Dict:
+    """Median of the app timings over several fresh processes, run in a scratch directory"""
+    runs = []
+    for _ in range(repeat):
+        # The app creates ./cache and ./chroma_db relative to the working directory
+        with tempfile.TemporaryDirectory(prefix="h1b-cold-start-") as workdir:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(reruns)],
+                capture_output=True, text=True, cwd=workdir
+            )
+        if completed.returncode != 0:
+            raise RuntimeError(f"App measurement failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    result = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("streamlit_import_ms", "first_run_ms", "cold_start_ms", "rerun_p50_ms", "rerun_p95_ms")
+    }
+    result["deferred_modules_loaded"] = sorted({module for run in runs for module in run["deferred_modules_loaded"]})
+    return result
+
+
+def print_report(imports: Dict[str, Optional[float]], app: Dict) -> None:
+    print(f"{'Module':<12} {'import ms':>10}")
+    for module, elapsed in imports.items():
+        print(f"{module:<12} {'not installed' if elapsed is None else f'{elapsed:.1f}':>10}")
+    print()
+    print(f"{'App':<24} {'ms':>10}")
+    for key in ("streamlit_import_ms", "first_run_ms", "cold_start_ms", "rerun_p50_ms", "rerun_p95_ms"):
+        print(f"{key:<24} {app[key]:>10.1f}")
+    print(f"Deferred modules loaded by the first page: {', '.join(app['deferred_modules_loaded']) or 'none'}")
+
+
+def check_budgets(app: Dict, cold_budget_ms: float, rerun_budget_ms: float) -> List[str]:
+    failures = []
+    if app["cold_start_ms"] > cold_budget_ms:
+        failures.append(f"cold start {app['cold_start_ms']:.0f} ms exceeds budget of {cold_budget_ms:.0f} ms")
+    if app["rerun_p50_ms"] > rerun_budget_ms:
+        failures.append(f"rerun p50 {app['rerun_p50_ms']:.0f} ms exceeds budget of {rerun_budget_ms:.0f} ms")
+    if app["deferred_modules_loaded"]:
+        failures.append(f"first page loaded deferred modules: {', '.join(app['deferred_modules_loaded'])}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure app cold-start and rerun time against a budget")
+    parser.add_argument("--reruns", type=int, default=20, help="Warm reruns timed per app process")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--cold-budget-ms", type=float, default=DEFAULT_COLD_BUDGET_MS,
+                        help="Maximum time from process start to the first rendered page")
+    parser.add_argument("--rerun-budget-ms", type=float, default=DEFAULT_RERUN_BUDGET_MS,
+                        help="Maximum median time of a warm rerun")
+    parser.add_argument("--json-out", help="Also write the results to this JSON file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_app(args.reruns)))
+        return 0
+
+    imports = {module: measure_import(module, args.repeat) for module in HEAVY_MODULES}
+    app = measure_app(args.reruns, args.repeat)
+    print_report(imports, app)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({"imports": imports, "app": app}, f, indent=2)
+
+    failures = check_budgets(app, args.cold_budget_ms, args.rerun_budget_ms)
+    for failure in failures:
+        print(f"Budget exceeded: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Local OpenAI-compatible chat completions stub for benchmarks.
+
+Serves recorded fixture responses from benchmarks/fixtures with a
+configurable latency and jitter, including streamed (SSE) responses:
+
+    python benchmarks/mock_llm_server.py --port 8765 --latency 1.5 --jitter 0.5
+
+Point the app or CLI at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Fixture returned when the system prompt contains the marker; the first match wins
+FIXTURE_ROUTES = [
+    ("H1B visa analyst", "h1b_eligibility.json"),
+    ("requirement profile", "jd_profile.json"),
+    ("ATS system analyzer", "resume_jd_match.json"),
+]
+DEFAULT_FIXTURE = "resume_jd_match.json"
+STREAM_CHUNK_CHARS = 24
+# Packed match requests label each resume with a line like "Candidate ID: C1"
+CANDIDATE_ID_PATTERN = re.compile(r"^Candidate ID: (\S+)$", re.MULTILINE)
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def pick_fixture(messages: List[Dict]) -> str:
+    """Choose the fixture file for a request based on its system prompt"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    for marker, fixture in FIXTURE_ROUTES:
+        if marker in system:
+            return fixture
+    return DEFAULT_FIXTURE
+
+
+def pack_fixture(content: str, messages: List[Dict]) -> str:
+    """Answer a packed request with one copy of the fixture per candidate id, as a JSON array"""
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    candidate_ids = CANDIDATE_ID_PATTERN.findall(user)
+    if not candidate_ids:
+        return content
+    item = json.loads(content)
+    return json.dumps([{"candidate_id": candidate_id, **item} for candidate_id in candidate_ids], indent=4)
+
+
+def make_handler(latency: float, jitter: float, chunk_delay: float):
+    fixtures: Dict[str, str] = {}
+
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            fixture = pick_fixture(request.get("messages", []))
+            if fixture not in fixtures:
+                fixtures[fixture] = load_fixture(fixture)
+            content = pack_fixture(fixtures[fixture], request.get("messages", []))
+
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+            prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+            usage = {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (prompt_chars + len(content)) // 4
+            }
+            base = {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "created": int(time.time()),
+                "model": request.get("model", "mock")
+            }
+
+            if request.get("stream"):
+                self._send_stream(base, content, usage, request)
+            else:
+                self._send_json({
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": usage
+                })
+
+        def _send_json(self, payload: Dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, base: Dict, content: str, usage: Dict, request: Dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def send(choices: List[Dict], **extra):
+                chunk = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                send([{"index": 0, "delta": {"content": content[start:start + STREAM_CHUNK_CHARS]}, "finish_reason": None}])
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+            send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (request.get("stream_options") or {}).get("include_usage"):
+                send([], usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return ChatCompletionsHandler
+
+
+def start_mock_server(
+    latency: float = 0.5,
+    jitter: float = 0.1,
+    chunk_delay: float = 0.0,
+    port: int = 0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a background thread, returning the server and its OpenAI base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, jitter, chunk_delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform +/- jitter in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Delay between streamed chunks in seconds")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency, args.jitter, args.chunk_delay))
+    print(f"Mock LLM server listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Benchmark the screening pipeline against a local mock LLM.
+
+Measures per-stage p50/p95 latency and peak memory for document
+extraction, prompt construction and both analyses, plus batch screening
+throughput at several concurrency levels:
+
+    python benchmarks/run_benchmarks.py --iterations 20 --latency 0.3 --concurrency 1 4 16
+
+No OpenAI key or network access is needed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import documents  # noqa: E402
+import screening  # noqa: E402
+from batch import screen_resume_packs, screen_resumes  # noqa: E402
+from mock_llm_server import start_mock_server  # noqa: E402
+from rules import evaluate_rule_sections  # noqa: E402
+
+SAMPLE_RESUMES = [
+    "test_cases/Business Analyst.pdf",
+    "test_cases/Data Scientist.pdf",
+    "test_cases/Job Title.docx",
+    "test_cases/Software Developer.pdf",
+    "JD & Resume/SaiG_Resume_resume.pdf",
+]
+SAMPLE_JD = "JD & Resume/JD_software.docx"
+SAMPLE_TRANSCRIPT = "JD & Resume/Transcript_masters.pdf"
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SAMPLE_JD_ANALYSIS = os.path.join(FIXTURES_DIR, "resume_jd_match.json")
+SAMPLE_JD_PROFILE = os.path.join(FIXTURES_DIR, "jd_profile.json")
+
+
+class NullCache:
+    """Result cache stand-in that never hits, so every call reaches the mock LLM"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def traced_peak_kb(func: Callable) -> float:
+    """Peak memory allocated while running func once, in KB"""
+    # Tracing slows Python code down a lot, so memory is measured in a separate run from latency
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def measure(name: str, func: Callable, iterations: int) -> Dict:
+    """Run func repeatedly and report latency percentiles and peak traced memory"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "stage": name,
+        "iterations": iterations,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "mean_ms": statistics.mean(timings) * 1000,
+        "peak_memory_kb": traced_peak_kb(func)
+    }
+
+
+def read_sample(path: str) -> bytes:
+    with open(os.path.join(REPO_ROOT, path), 'rb') as f:
+        return f.read()
+
+
+def run_stage_benchmarks(iterations: int) -> List[Dict]:
+    resume_files = [(os.path.basename(p), read_sample(p)) for p in SAMPLE_RESUMES]
+    jd_name, jd_bytes = os.path.basename(SAMPLE_JD), read_sample(SAMPLE_JD)
+    transcript_name, transcript_bytes = os.path.basename(SAMPLE_TRANSCRIPT), read_sample(SAMPLE_TRANSCRIPT)
+
+    resume_text = documents.extract_text(*resume_files[-1])
+    jd_text = documents.extract_text(jd_name, jd_bytes)
+    transcript_text = documents.extract_text(transcript_name, transcript_bytes)
+    with open(SAMPLE_JD_ANALYSIS, 'r', encoding='utf-8') as f:
+        jd_analysis = json.load(f)
+    with open(SAMPLE_JD_PROFILE, 'r', encoding='utf-8') as f:
+        jd_profile = json.load(f)
+
+    visa_end = datetime.now() + timedelta(days=200)
+    timeline = screening.calculate_visa_timeline("F1 - OPT", datetime.now() - timedelta(days=165), visa_end)
+    rule_sections = evaluate_rule_sections("F1 - OPT", True, visa_end, jd_analysis["match_percentage"])
+    criminal_history = {"has_history": False, "details": None}
+
+    def extract_all(use_cache: bool):
+        for name, data in resume_files + [(jd_name, jd_bytes), (transcript_name, transcript_bytes)]:
+            documents.extract_text(name, data, use_cache=use_cache)
+
+    # Warm the document cache so the cached stage measures hits only
+    extract_all(True)
+
+    return [
+        measure("extract_text (cold)", lambda: extract_all(False), iterations),
+        measure("extract_text (cached)", lambda: extract_all(True), iterations),
+        measure("build_jd_profile_messages", lambda: screening.build_jd_profile_messages(jd_text), iterations),
+        measure("build_resume_jd_match_messages", lambda: screening.build_resume_jd_match_messages(resume_text, jd_profile), iterations),
+        measure(
+            "build_h1b_eligibility_messages",
+            lambda: screening.build_h1b_eligibility_messages(
+                transcript_text, jd_analysis, "F1 - OPT", True, timeline, rule_sections, criminal_history
+            ),
+            iterations
+        ),
+        measure(
+            "request_jd_profile",
+            lambda: screening.request_jd_profile(jd_text, cache=NullCache()),
+            iterations
+        ),
+        measure(
+            "request_resume_jd_match",
+            lambda: screening.request_resume_jd_match(resume_text, jd_text, cache=NullCache(), jd_profile=jd_profile),
+            iterations
+        ),
+        measure(
+            "request_h1b_eligibility",
+            lambda: screening.request_h1b_eligibility(
+                transcript_text, jd_analysis, "F1 - OPT", True, None, visa_end, criminal_history, cache=NullCache()
+            ),
+            iterations
+        ),
+    ]
+
+
+def run_throughput_benchmarks(concurrency_levels: List[int], candidates: int) -> List[Dict]:
+    jd_text = documents.extract_text(os.path.basename(SAMPLE_JD), read_sample(SAMPLE_JD))
+    base_texts = [documents.extract_text(os.path.basename(p), read_sample(p)) for p in SAMPLE_RESUMES]
+    resumes = {f"candidate-{i}": f"{base_texts[i % len(base_texts)]}\nCandidate {i}" for i in range(candidates)}
+    # Like the app and CLI, the JD profile is computed once per run rather than per candidate
+    jd_profile = screening.request_jd_profile(jd_text, cache=NullCache())
+
+    results = []
+    for packed in (False, True):
+        for concurrency in concurrency_levels:
+            def run():
+                if packed:
+                    screened = screen_resume_packs(
+                        screening.pack_resumes(resumes),
+                        jd_text,
+                        lambda r, j: screening.request_packed_resume_jd_match(r, j, cache=NullCache(), jd_profile=jd_profile),
+                        max_concurrency=concurrency
+                    )
+                else:
+                    screened = screen_resumes(
+                        resumes,
+                        jd_text,
+                        lambda r, j: screening.request_resume_jd_match(r, j, cache=NullCache(), jd_profile=jd_profile),
+                        max_concurrency=concurrency
+                    )
+                return sum(1 for result in screened if result["error"])
+
+            start = time.perf_counter()
+            errors = run()
+            elapsed = time.perf_counter() - start
+            results.append({
+                "packed": packed,
+                "concurrency": concurrency,
+                "candidates": candidates,
+                "errors": errors,
+                "elapsed_s": elapsed,
+                "candidates_per_s": candidates / elapsed,
+                "peak_memory_kb": traced_peak_kb(run)
+            })
+    return results
+
+
+def print_report(stages: List[Dict], throughput: List[Dict]):
+    print(f"{'Stage':<34} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10} {'peak KB':>10}")
+    for row in stages:
+        print(f"{row['stage']:<34} {row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['mean_ms']:>10.2f} {row['peak_memory_kb']:>10.1f}")
+    print()
+    print(f"{'Packed':<8} {'Concurrency':<12} {'Candidates':>10} {'Errors':>8} {'Elapsed s':>10} {'Cand/s':>10} {'peak KB':>10}")
+    for row in throughput:
+        print(
+            f"{str(row['packed']):<8} {row['concurrency']:<12} {row['candidates']:>10} {row['errors']:>8} {row['elapsed_s']:>10.2f} "
+            f"{row['candidates_per_s']:>10.2f} {row['peak_memory_kb']:>10.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the screening pipeline against a mock LLM")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations per stage")
+    parser.add_argument("--latency", type=float, default=0.3, help="Mock LLM mean latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Mock LLM latency jitter in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels for throughput")
+    parser.add_argument("--candidates", type=int, default=32, help="Resumes per throughput run")
+    parser.add_argument("--json-out", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Keep the benchmark's document cache away from the app's
+    documents.DOCUMENT_CACHE_DIR = tempfile.mkdtemp(prefix="h1b-bench-docs-")
+
+    server, base_url = start_mock_server(latency=args.latency, jitter=args.jitter)
+    from openai import OpenAI
+    screening.set_client(OpenAI(api_key="benchmark", base_url=base_url, max_retries=0))
+
+    try:
+        stages = run_stage_benchmarks(args.iterations)
+        throughput = run_throughput_benchmarks(args.concurrency, args.candidates)
+    finally:
+        server.shutdown()
+
+    print_report(stages, throughput)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({"stages": stages, "throughput": throughput}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
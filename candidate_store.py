@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from result_cache import normalize_text
+
+DEFAULT_STORE_PATH = "./cache/candidates.sqlite3"
+
+# Weights of the leaderboard score; each component is on a 0-100 scale
+MATCH_WEIGHT = 0.5
+CONFIDENCE_WEIGHT = 0.3
+RISK_WEIGHT = 0.2
+RISK_LEVEL_SCORES = {"LOW": 100, "MEDIUM": 50, "HIGH": 0}
+RISK_LEVELS = list(RISK_LEVEL_SCORES)
+# Candidates without an eligibility assessment are scored as medium risk
+UNASSESSED_RISK_SCORE = 50
+
+
+def make_document_id(text: str) -> str:
+    """Stable id for a job description or resume, insensitive to whitespace and case"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()[:16]
+
+
+def compute_rank_score(
+    match_percentage: Optional[float],
+    confidence_score: Optional[float] = None,
+    risk_level: Optional[str] = None
+) -> float:
+    """Combine match percentage, eligibility confidence and risk level into one 0-100 score
+
+    Until a candidate has an eligibility assessment, the match percentage stands
+    in for the confidence score so match-only candidates rank alongside assessed ones.
+    """
+    match = float(match_percentage or 0)
+    confidence = match if confidence_score is None else float(confidence_score)
+    risk = RISK_LEVEL_SCORES.get((risk_level or "").upper(), UNASSESSED_RISK_SCORE)
+    return round(MATCH_WEIGHT * match + CONFIDENCE_WEIGHT * confidence + RISK_WEIGHT * risk, 2)
+
+
+class CandidateStore:
+    """Persistent SQLite store of per-candidate results for each job description
+
+    The rank score is computed when a result is saved and indexed per job, so
+    adding a candidate never rescores the others and the leaderboard is a single
+    indexed query.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                jd_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                profile TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS candidates (
+                jd_id TEXT NOT NULL REFERENCES jobs(jd_id),
+                candidate TEXT NOT NULL,
+                resume_id TEXT NOT NULL,
+                jd_analysis TEXT NOT NULL,
+                eligibility TEXT,
+                match_percentage REAL,
+                confidence_score REAL,
+                risk_level TEXT,
+                eligible INTEGER,
+                visa_status TEXT,
+                is_stem_degree INTEGER,
+                rank_score REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (jd_id, candidate)
+            );
+            CREATE INDEX IF NOT EXISTS idx_candidates_rank ON candidates(jd_id, rank_score DESC);
+            CREATE INDEX IF NOT EXISTS idx_candidates_risk ON candidates(jd_id, risk_level, rank_score DESC);
+            """
+        )
+        # Stores created before these columns were added are migrated in place
+        for table, column, column_type in (
+            ("candidates", "visa_status", "TEXT"),
+            ("candidates", "is_stem_degree", "INTEGER"),
+            ("jobs", "profile", "TEXT")
+        ):
+            columns = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    def add_job(self, jd_text: str, title: str, profile: Optional[Dict] = None) -> str:
+        """Register a job description and return its id; re-adding the same text keeps the first title
+
+        The JD requirement profile, when given, is stored for matching resumes across jobs.
+        """
+        jd_id = make_document_id(jd_text)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (jd_id, title, profile, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (jd_id) DO UPDATE SET profile = COALESCE(excluded.profile, profile)
+                """,
+                (jd_id, title, json.dumps(profile) if profile is not None else None, time.time())
+            )
+            self._conn.commit()
+        return jd_id
+
+    def list_job_profiles(self) -> List[Dict]:
+        """Jobs that have a stored requirement profile, as dicts with jd_id, title and profile"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT jd_id, title, profile FROM jobs WHERE profile IS NOT NULL ORDER BY created_at DESC"
+            ).fetchall()
+        return [{"jd_id": row["jd_id"], "title": row["title"], "profile": json.loads(row["profile"])} for row in rows]
+
+    def list_jobs(self) -> List[Dict]:
+        """All jobs with their candidate counts, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT j.jd_id, j.title, j.created_at, COUNT(c.candidate) AS candidates
+                FROM jobs j LEFT JOIN candidates c ON c.jd_id = j.jd_id
+                GROUP BY j.jd_id ORDER BY j.created_at DESC
+                """
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_match(self, jd_id: str, candidate: str, resume_text: str, jd_analysis: Dict) -> None:
+        """Store a resume-JD match result, dropping any eligibility assessment of an older resume"""
+        resume_id = make_document_id(resume_text)
+        match_percentage = jd_analysis.get("match_percentage")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO candidates (
+                    jd_id, candidate, resume_id, jd_analysis, match_percentage, rank_score, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (jd_id, candidate) DO UPDATE SET
+                    jd_analysis = excluded.jd_analysis,
+                    match_percentage = excluded.match_percentage,
+                    eligibility = CASE WHEN resume_id = excluded.resume_id THEN eligibility END,
+                    confidence_score = CASE WHEN resume_id = excluded.resume_id THEN confidence_score END,
+                    risk_level = CASE WHEN resume_id = excluded.resume_id THEN risk_level END,
+                    eligible = CASE WHEN resume_id = excluded.resume_id THEN eligible END,
+                    visa_status = CASE WHEN resume_id = excluded.resume_id THEN visa_status END,
+                    is_stem_degree = CASE WHEN resume_id = excluded.resume_id THEN is_stem_degree END,
+                    resume_id = excluded.resume_id,
+                    updated_at = excluded.updated_at
+                """,
+                (jd_id, candidate, resume_id, json.dumps(jd_analysis), match_percentage,
+                 compute_rank_score(match_percentage), time.time())
+            )
+            self._rescore(jd_id, candidate)
+            self._conn.commit()
+
+    def save_eligibility(
+        self,
+        jd_id: str,
+        candidate: str,
+        eligibility: Dict,
+        visa_status: Optional[str] = None,
+        is_stem_degree: Optional[bool] = None
+    ) -> None:
+        """Attach an H1B eligibility assessment, and the inputs it was made from, to a candidate with a match result"""
+        overall = eligibility.get("overall_assessment", {})
+        risk_level = overall.get("risk_level")
+        with self._lock:
+            updated = self._conn.execute(
+                """
+                UPDATE candidates SET
+                    eligibility = ?, confidence_score = ?, risk_level = ?, eligible = ?,
+                    visa_status = ?, is_stem_degree = ?, updated_at = ?
+                WHERE jd_id = ? AND candidate = ?
+                """,
+                (json.dumps(eligibility), overall.get("confidence_score"),
+                 risk_level.upper() if isinstance(risk_level, str) else None,
+                 None if overall.get("eligible") is None else int(bool(overall["eligible"])),
+                 visa_status, None if is_stem_degree is None else int(bool(is_stem_degree)),
+                 time.time(), jd_id, candidate)
+            ).rowcount
+            if not updated:
+                raise KeyError(f"No match result stored for {candidate!r}")
+            self._rescore(jd_id, candidate)
+            self._conn.commit()
+
+    def get_scored_resumes(self, jd_id: str) -> Dict[str, str]:
+        """Map each candidate already scored against a job to the id of the resume that was scored"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT candidate, resume_id FROM candidates WHERE jd_id = ?", (jd_id,)
+            ).fetchall()
+        return {row["candidate"]: row["resume_id"] for row in rows}
+
+    def get_candidate(self, jd_id: str, candidate: str) -> Optional[Dict]:
+        """Full stored record for one candidate, including the analyses and current rank"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM candidates WHERE jd_id = ? AND candidate = ?", (jd_id, candidate)
+            ).fetchone()
+            if row is None:
+                return None
+            rank = self._conn.execute(
+                "SELECT COUNT(*) FROM candidates WHERE jd_id = ? AND rank_score > ?", (jd_id, row["rank_score"])
+            ).fetchone()[0] + 1
+        record = dict(row)
+        record["jd_analysis"] = json.loads(record["jd_analysis"])
+        record["eligibility"] = json.loads(record["eligibility"]) if record["eligibility"] else None
+        record["rank"] = rank
+        return record
+
+    def leaderboard(
+        self,
+        jd_id: str,
+        min_match: Optional[float] = None,
+        risk_levels: Optional[Sequence[str]] = None,
+        assessed_only: bool = False,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict]:
+        """Candidates for a job ordered by rank score, with optional filters and paging"""
+        where = ["jd_id = ?"]
+        params: List = [jd_id]
+        if min_match is not None:
+            where.append("match_percentage >= ?")
+            params.append(min_match)
+        if risk_levels:
+            where.append(f"risk_level IN ({', '.join('?' for _ in risk_levels)})")
+            params.extend(risk_levels)
+        if assessed_only:
+            where.append("eligibility IS NOT NULL")
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT candidate, rank_score, match_percentage, confidence_score, risk_level, eligible,
+                       visa_status, is_stem_degree, eligibility IS NOT NULL AS assessed, updated_at
+                FROM candidates WHERE {' AND '.join(where)}
+                ORDER BY rank_score DESC, candidate LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove_candidate(self, jd_id: str, candidate: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM candidates WHERE jd_id = ? AND candidate = ?", (jd_id, candidate))
+            self._conn.commit()
+
+    def _rescore(self, jd_id: str, candidate: str) -> None:
+        row = self._conn.execute(
+            "SELECT match_percentage, confidence_score, risk_level FROM candidates WHERE jd_id = ? AND candidate = ?",
+            (jd_id, candidate)
+        ).fetchone()
+        self._conn.execute(
+            "UPDATE candidates SET rank_score = ? WHERE jd_id = ? AND candidate = ?",
+            (compute_rank_score(*row), jd_id, candidate)
+        )
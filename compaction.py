@@ -0,0 +1,220 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from documents import PAGE_BREAK
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+# Per-document token budgets; gpt-3.5-turbo has a 16k context shared by prompt and completion
+RESUME_TOKEN_BUDGET = 2500
+JD_TOKEN_BUDGET = 1500
+TRANSCRIPT_TOKEN_BUDGET = 1500
+TRUNCATION_MARKER = "\n[...truncated...]"
+# Shorter lines (single words, skills, years) repeat legitimately and are never treated as page headers
+MIN_REPEATED_LINE_LENGTH = 20
+
+# Lines that carry no information for matching or eligibility analysis
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r"^page\s*\d+(\s*(of|/)\s*\d+)?$",
+        r"^-\s*\d{1,3}\s*-$",
+        r"^(unofficial transcript|for advising purposes only|this is not an official transcript.*)$",
+        r"^(printed|generated|as of)[:\s].*\d{2,4}$",
+        r"^.*\b(is an|are an|is a proud) equal (employment )?opportunity( and affirmative action)? employer\b.*$",
+        r"^.*\breasonable accommodations?\b.*(disabilit|applicants?).*$",
+        r"^.*\ball qualified applicants will receive consideration\b.*$",
+        r"^.*\b(copyright|©|all rights reserved)\b.*$",
+        r"^.*\bconfidential(ity)? notice\b.*$",
+    ]
+]
+
+COURSE_CODE = r"[A-Z]{2,5}\s?-?\d{3,4}[A-Z]?"
+GRADE = r"(?:[A-F][+-]?|P|S|U|W|I|CR|NC)"
+CREDITS = r"\d{1,2}\.\d{1,2}|\d"
+# "ENPM662  INTRO TO ROBOT MODELING  A  3.00 ..." (grade before credits)
+COURSE_GRADE_FIRST = re.compile(
+    rf"^\s*(?P<code>{COURSE_CODE})\s+(?P<title>.+?)\s+(?P<grade>{GRADE})\s+(?P<credits>{CREDITS})\b"
+)
+# "CS 5100  Foundations of AI  4.0  A" (credits before grade)
+COURSE_CREDITS_FIRST = re.compile(
+    rf"^\s*(?P<code>{COURSE_CODE})\s+(?P<title>.+?)\s+(?P<credits>{CREDITS})\s+(?P<grade>{GRADE})\s*$"
+)
+TERM_PATTERN = re.compile(r"^\s*((fall|spring|summer|winter)(\s+[iv]+)?\s+\d{4})\b", re.IGNORECASE)
+TRANSCRIPT_SUMMARY_PATTERN = re.compile(
+    r"\b(gpa|cumulative|degree|major|minor|program|awarded|conferred|honors|master|bachelor|doctor)\b",
+    re.IGNORECASE
+)
+MIN_COURSES_FOR_TABLE = 3
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING):
+    """tiktoken encoding, imported and loaded on first use; None when tiktoken is not installed"""
+    try:
+        import tiktoken
+    except ImportError:  # tiktoken is optional; fall back to a character-based estimate
+        return None
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Count tokens with tiktoken when installed, otherwise estimate from the character count"""
+    if not text:
+        return 0
+    encoding = get_encoding(encoding_name)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_budget(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> Tuple[str, bool]:
+    """Cut text down to max_tokens, returning the text and whether it was truncated"""
+    if count_tokens(text, encoding_name) <= max_tokens:
+        return text, False
+    encoding = get_encoding(encoding_name)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + TRUNCATION_MARKER, True
+    return text[:max_tokens * CHARS_PER_TOKEN] + TRUNCATION_MARKER, True
+
+
+def normalize_whitespace(text: str) -> List[str]:
+    """Split into lines with runs of whitespace collapsed and empty lines removed"""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return [line for line in lines if line]
+
+
+def is_boilerplate(line: str) -> bool:
+    """Check whether a line is a page number, disclaimer, EEO statement or similar"""
+    return any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS)
+
+
+def dedupe_lines(lines: List[str]) -> List[str]:
+    """Drop exact repeats of a line, keeping the first occurrence"""
+    seen = set()
+    unique = []
+    for line in lines:
+        if line not in seen:
+            seen.add(line)
+            unique.append(line)
+    return unique
+
+
+def drop_page_furniture(pages: List[List[str]]) -> List[List[str]]:
+    """Drop page headers, footers and trailing page numbers from the lines of each page
+
+    A header or footer is a line of at least MIN_REPEATED_LINE_LENGTH characters
+    that appears on more than one page; its first occurrence is kept. A bare
+    number is only dropped when it is the last line of a page and equals that
+    page's number.
+    """
+    page_counts: Dict[str, int] = {}
+    for lines in pages:
+        for line in set(lines):
+            if len(line) >= MIN_REPEATED_LINE_LENGTH:
+                page_counts[line] = page_counts.get(line, 0) + 1
+
+    seen = set()
+    kept_pages = []
+    for page_number, lines in enumerate(pages, start=1):
+        if len(pages) > 1 and lines and lines[-1] == str(page_number):
+            lines = lines[:-1]
+        kept = []
+        for line in lines:
+            if page_counts.get(line, 0) > 1:
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+        kept_pages.append(kept)
+    return kept_pages
+
+
+def compact_text(text: str, drop_furniture: bool = True) -> str:
+    """Collapse whitespace, drop boilerplate lines and, with drop_furniture, headers and footers repeated across pages"""
+    pages = [
+        [line for line in normalize_whitespace(page) if not is_boilerplate(line)]
+        for page in text.split(PAGE_BREAK)
+    ]
+    if drop_furniture:
+        pages = drop_page_furniture(pages)
+    return "\n".join(line for lines in pages for line in lines)
+
+
+def extract_transcript_courses(text: str) -> Optional[str]:
+    """Extract a compact course table from transcript text, or None if it does not look like one
+
+    Output keeps degree, major and GPA summary lines followed by one
+    "CODE Title | Grade | Credits" row per course, grouped by term.
+    """
+    summary: List[str] = []
+    rows: List[str] = []
+    course_count = 0
+    for line in normalize_whitespace(text):
+        match = COURSE_GRADE_FIRST.match(line) or COURSE_CREDITS_FIRST.match(line)
+        if match:
+            rows.append(f"{match.group('code')} {match.group('title').title()} | {match.group('grade')} | {match.group('credits')}")
+            course_count += 1
+        elif TERM_PATTERN.match(line):
+            rows.append(TERM_PATTERN.match(line).group(1).title() + ":")
+        elif TRANSCRIPT_SUMMARY_PATTERN.search(line) and not is_boilerplate(line):
+            summary.append(line)
+
+    if course_count < MIN_COURSES_FOR_TABLE:
+        return None
+
+    # Per-semester GPA lines repeat; the latest cumulative line is the one that matters
+    cumulative = [line for line in summary if "cumulative" in line.lower()]
+    summary = [line for line in summary if "cumulative" not in line.lower() and "semester" not in line.lower()]
+    if cumulative:
+        summary.append(cumulative[-1])
+
+    # Drop term headers with no courses under them
+    table = [row for i, row in enumerate(rows) if not row.endswith(":") or (i + 1 < len(rows) and not rows[i + 1].endswith(":"))]
+    return "\n".join(dedupe_lines(summary) + ["Course | Grade | Credits"] + table)
+
+
+def compact_document(text: str, max_tokens: int, kind: str = "document") -> Tuple[str, Dict]:
+    """Compact a document to fit a token budget, returning the text and a token report
+
+    Whitespace collapsing, boilerplate removal and the transcript course table
+    always apply. The steps that can lose content, dropping lines repeated
+    across pages and truncation, only run while the document is over budget.
+    """
+    text = text or ""
+    compacted = None
+    if kind == "transcript":
+        compacted = extract_transcript_courses(text)
+    if compacted is None:
+        compacted = compact_text(text, drop_furniture=False)
+        if count_tokens(compacted) > max_tokens:
+            compacted = compact_text(text)
+    compacted, truncated = truncate_to_budget(compacted, max_tokens)
+
+    report = {
+        "kind": kind,
+        "tokens_before": count_tokens(text),
+        "tokens_after": count_tokens(compacted),
+        "truncated": truncated
+    }
+    return compacted, report
+
+
+def log_compaction(call_name: str, reports: List[Dict]) -> None:
+    """Log tokens before and after compaction for each document of an LLM call"""
+    before = sum(report["tokens_before"] for report in reports)
+    after = sum(report["tokens_after"] for report in reports)
+    details = ", ".join(
+        f"{report['kind']} {report['tokens_before']} -> {report['tokens_after']}"
+        + (" (truncated)" if report["truncated"] else "")
+        for report in reports
+    )
+    for report in reports:
+        metrics.inc("compaction_tokens_total", report["tokens_before"], call=call_name, kind=report["kind"], stage="before")
+        metrics.inc("compaction_tokens_total", report["tokens_after"], call=call_name, kind=report["kind"], stage="after")
+    logger.info("%s prompt compaction: %d -> %d tokens (%s)", call_name, before, after, details)
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from metrics import metrics
+
+SUPPORTED_FILE_TYPES = ['pdf', 'docx', 'txt']
+
+DOCUMENT_CACHE_DIR = "./cache/documents"
+MEMORY_CACHE_SIZE = 256
+# Bump when extraction output changes so stale on-disk entries are ignored
+EXTRACTOR_VERSION = "2"
+# Separates PDF pages so compaction can tell page headers and footers from repeated content
+PAGE_BREAK = "\f"
+
+# PDFs with at least this many pages are split across a process pool
+PARALLEL_PAGE_THRESHOLD = 16
+PAGES_PER_CHUNK = 8
+
+_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_file_type(file_name: str) -> str:
+    """Return the lower-cased extension of a file name"""
+    return file_name.split('.')[-1].lower()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return _process_pool
+
+
+def _extract_pdf_pages(data: bytes, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF; runs inside pool workers"""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+def _extract_pdf(data: bytes) -> str:
+    # Parsers are imported on first use so app start-up does not pay for them
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    page_count = len(pdf_reader.pages)
+
+    if page_count < PARALLEL_PAGE_THRESHOLD or (os.cpu_count() or 1) < 2:
+        return PAGE_BREAK.join(page.extract_text() for page in pdf_reader.pages)
+
+    # Each worker re-parses the PDF from bytes since page objects cannot be pickled
+    pool = _get_process_pool()
+    chunks = [
+        pool.submit(_extract_pdf_pages, data, start, min(start + PAGES_PER_CHUNK, page_count))
+        for start in range(0, page_count, PAGES_PER_CHUNK)
+    ]
+    return PAGE_BREAK.join(text for chunk in chunks for text in chunk.result())
+
+
+def _parse(file_type: str, data: bytes) -> str:
+    if file_type == 'pdf':
+        return _extract_pdf(data)
+    elif file_type == 'docx':
+        import docx2txt
+
+        return docx2txt.process(io.BytesIO(data))
+    elif file_type == 'txt':
+        return data.decode('utf-8')
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def _cache_key(file_type: str, data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}-{file_type}-v{EXTRACTOR_VERSION}"
+
+
+def _read_disk_cache(key: str) -> Optional[str]:
+    try:
+        with open(os.path.join(DOCUMENT_CACHE_DIR, f"{key}.txt"), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk_cache(key: str, text: str) -> None:
+    try:
+        os.makedirs(DOCUMENT_CACHE_DIR, exist_ok=True)
+        # Write to a temp file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=DOCUMENT_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(DOCUMENT_CACHE_DIR, f"{key}.txt"))
+    except OSError:
+        # The disk layer is best effort; extraction already succeeded
+        pass
+
+
+def _remember(key: str, text: str) -> None:
+    with _memory_cache_lock:
+        _memory_cache[key] = text
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def extract_text(file_name: str, data: bytes, use_cache: bool = True) -> str:
+    """Extract plain text from raw document bytes, raising ValueError for unsupported types
+
+    Results are memoized by content hash in memory and on disk, so the same
+    upload is only parsed once across reruns and restarts.
+    """
+    file_type = get_file_type(file_name)
+    if file_type not in SUPPORTED_FILE_TYPES:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    with metrics.span("extract_text", file_type=file_type):
+        if not use_cache:
+            return _parse(file_type, data)
+
+        key = _cache_key(file_type, data)
+        with _memory_cache_lock:
+            if key in _memory_cache:
+                _memory_cache.move_to_end(key)
+                metrics.record_cache("document", hit=True)
+                return _memory_cache[key]
+
+        text = _read_disk_cache(key)
+        metrics.record_cache("document", hit=text is not None)
+        if text is None:
+            text = _parse(file_type, data)
+            _write_disk_cache(key, text)
+
+        _remember(key, text)
+        return text
+
@@ -0,0 +1,63 @@
+"""Historical outcome import and score calibration without Streamlit.
+
+Imports past assessments with their real outcomes (APPROVED, RFE, DENIED)
+from CSV or Parquet files into the local outcome store, then fits the
+calibration that maps raw LLM confidence, match percentage, STEM flag and
+visa status to approval probabilities:
+
+    python h1b_calibrate.py --import outcomes_2024.csv outcomes_2025.parquet --fit
+
+Outcome files need `confidence_score` and `outcome` columns, plus optionally
+`candidate`, `jd_id`, `match_percentage`, `is_stem_degree`, `visa_status`
+and `decided_at`.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from outcomes import DEFAULT_CALIBRATION_PATH, DEFAULT_OUTCOME_PATH
+
+    parser = argparse.ArgumentParser(
+        prog="h1b-calibrate",
+        description="Import historical H1B outcomes and calibrate LLM confidence scores against them."
+    )
+    parser.add_argument("--import", dest="imports", nargs="+", default=[], help="CSV or Parquet outcome files to add")
+    parser.add_argument("--fit", action="store_true", help="Fit and save the calibration on the outcome store")
+    parser.add_argument("--store", default=DEFAULT_OUTCOME_PATH, help="Outcome store file (.parquet or .csv)")
+    parser.add_argument("--calibration", default=DEFAULT_CALIBRATION_PATH, help="Where the calibration is saved")
+    args = parser.parse_args(argv)
+    if not args.imports and not args.fit:
+        parser.error("nothing to do; pass --import and/or --fit")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    from outcomes import OutcomeStore, fit_calibration
+
+    store = OutcomeStore(args.store)
+    for path in args.imports:
+        try:
+            total = store.import_file(path)
+        except (OSError, ValueError) as e:
+            print(f"Error importing {path}: {e}", file=sys.stderr)
+            return 1
+        print(f"Imported {path}; the store now holds {total} outcomes")
+
+    if args.fit:
+        try:
+            calibration = fit_calibration(store.load())
+        except ValueError as e:
+            print(f"Error fitting calibration: {e}", file=sys.stderr)
+            return 1
+        calibration.save(args.calibration)
+        print(json.dumps(calibration.metrics, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
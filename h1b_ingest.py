@@ -0,0 +1,90 @@
+"""Bulk resume ingestion without Streamlit.
+
+Streams a ZIP archive, folder or JSONL manifest of resumes (for example an
+ATS export), extracts their text across a process pool and writes normalized
+text plus metadata to an on-disk store as each document finishes:
+
+    python h1b_ingest.py ats_export.zip --store ./cache/ingested.sqlite3 --workers 8
+
+Running the same command again after an interruption resumes where it
+stopped: documents already in the store are not extracted again, and
+documents no longer in the source are removed from the store. Newly
+extracted resumes are also embedded into the ChromaDB resume index used by
+the embedding pre-filter (h1b_screen.py --top-k), unless --no-index is given.
+"""
+import argparse
+import logging
+import os
+import sys
+import zipfile
+from functools import partial
+from typing import List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from ingestion import DEFAULT_INGEST_PATH
+
+    parser = argparse.ArgumentParser(
+        prog="h1b-ingest",
+        description="Extract resumes from ZIP archives, folders or JSONL manifests into an on-disk store."
+    )
+    parser.add_argument("sources", nargs="+", help="ZIP archives, folders, JSONL manifests or single documents")
+    parser.add_argument("--store", default=DEFAULT_INGEST_PATH, help="SQLite file the extracted text is written to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Extraction processes")
+    parser.add_argument("--retry-failed", action="store_true", help="Extract documents that failed before again")
+    parser.add_argument("--chroma-path", default="./chroma_db", help="ChromaDB directory of the resume index")
+    parser.add_argument(
+        "--embedding-backend",
+        default="hash",
+        choices=["hash", "sentence-transformer"],
+        help="Embedding backend of the resume index"
+    )
+    parser.add_argument("--no-index", action="store_true", help="Do not embed ingested resumes into the resume index")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        stream=sys.stderr
+    )
+
+    from ingestion import IngestionStore, ingest, iter_source
+
+    store = IngestionStore(args.store)
+    index_fn = None
+    if not args.no_index:
+        # chromadb is slow to import, so it is only loaded when resumes are indexed
+        import chromadb
+        from resume_index import get_resume_collection, index_resumes
+
+        collection = get_resume_collection(chromadb.PersistentClient(path=args.chroma_path), args.embedding_backend)
+        index_fn = partial(index_resumes, collection)
+    failures = 0
+    for source in args.sources:
+        def report(progress):
+            done = progress["ingested"] + progress["failed"]
+            if done % 100 == 0:
+                logging.info("%s: %d extracted, %d failed", source, progress["ingested"], progress["failed"])
+
+        try:
+            stats = ingest(iter_source(source), store, os.path.abspath(source), workers=args.workers,
+                           retry_failed=args.retry_failed, on_progress=report, index_fn=index_fn)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            logging.error("Cannot read %s: %s", source, e)
+            failures += 1
+            continue
+        failures += stats["failed"]
+        print(
+            f"{source}: {stats['ingested']} ingested, {stats['skipped']} already ingested, "
+            f"{stats['failed']} failed, {stats['removed']} removed"
+        )
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Headless resume screening without Streamlit.
+
+Screens every resume in a folder, ZIP archive or JSONL manifest (or a list
+of files) against one job description and writes one JSON object per
+candidate as it finishes:
+
+    python h1b_screen.py --jd jd.pdf --resumes resumes/ --out results.jsonl
+
+Resumes already extracted with h1b_ingest.py are read with --ingested, and
+are named by their source path and document name (e.g.
+/data/export.zip/a.pdf). --ingested-source limits them to some sources.
+
+OPENAI_API_KEY must be set in the environment, unless LLM responses are
+replayed from a recording made with --record:
+
+    python h1b_screen.py --jd jd.pdf --resumes resumes/ --record calls.jsonl
+    python h1b_screen.py --jd jd.pdf --resumes resumes/ --replay calls.jsonl --replay-latency 1
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def iter_resume_documents(paths: List[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for resume files and for the resumes in folders, ZIP archives and JSONL manifests"""
+    from ingestion import iter_source
+
+    for path in paths:
+        for document in iter_source(path):
+            yield document.name, document.read()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="h1b-screen",
+        description="Screen resumes against a job description and emit newline-delimited JSON results."
+    )
+    parser.add_argument("--jd", required=True, help="Job description file (PDF, DOCX or TXT)")
+    parser.add_argument("--resumes", nargs="+", default=[], help="Resume files, folders, ZIP archives and/or JSONL manifests")
+    parser.add_argument("--ingested", help="Also screen every resume in this store written by h1b_ingest.py")
+    parser.add_argument(
+        "--ingested-source",
+        nargs="+",
+        default=[],
+        help="With --ingested, only screen resumes ingested from these ZIP archives, folders or manifests"
+    )
+    parser.add_argument("--out", default="-", help="Output JSONL file, or - for stdout (default)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent LLM requests")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries for rate-limited or failed requests")
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=None,
+        help="Only send the K resumes most similar to the JD for LLM analysis (embedding pre-filter)"
+    )
+    parser.add_argument("--chroma-path", default="./chroma_db", help="ChromaDB directory used by --top-k")
+    parser.add_argument(
+        "--embedding-backend",
+        default="hash",
+        choices=["hash", "sentence-transformer"],
+        help="Embedding backend used by --top-k"
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Analyze several short resumes per LLM call to cut round trips and input tokens"
+    )
+    parser.add_argument("--record", metavar="PATH", help="Append every LLM request and response to this JSONL file")
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Answer LLM requests from a recording made with --record instead of calling the API"
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        help="With --replay, sleep for this fraction of the recorded latency (1 reproduces it, 0 runs at full speed)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the persistent result cache so every analysis reaches the LLM (e.g. for load tests with --replay)"
+    )
+    parser.add_argument("--metrics-log", help="Append per-stage timing and token usage events to this JSONL file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to stderr")
+    args = parser.parse_args(argv)
+    if not args.resumes and not args.ingested:
+        parser.error("one of --resumes or --ingested is required")
+    if args.ingested_source and not args.ingested:
+        parser.error("--ingested-source requires --ingested")
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined")
+    return args
+
+
+def shortlist(resumes: Dict[str, str], jd_text: str, args: argparse.Namespace) -> Dict[str, str]:
+    """Reduce resumes to the top-K by embedding similarity, indexing them in Chroma on the way"""
+    # chromadb is slow to import, so only load it when the pre-filter is requested
+    import chromadb
+    from resume_index import get_resume_collection, index_resumes, shortlist_resumes
+
+    collection = get_resume_collection(chromadb.PersistentClient(path=args.chroma_path), args.embedding_backend)
+    resume_ids = index_resumes(collection, resumes)
+    items = shortlist_resumes(collection, jd_text, top_k=args.top_k, resume_ids=list(resume_ids.values()))
+    return {item["candidate"]: item["resume_text"] for item in items}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        stream=sys.stderr
+    )
+
+    from batch import call_with_retry, screen_resume_packs, screen_resumes
+    from documents import extract_text
+    from metrics import metrics
+    from result_cache import ResultCache
+    from screening import (
+        configure_llm_mode, pack_resumes, request_jd_profile, request_packed_resume_jd_match, request_resume_jd_match
+    )
+
+    if args.metrics_log:
+        metrics.log_path = args.metrics_log
+    if args.record:
+        configure_llm_mode("record", args.record)
+    elif args.replay:
+        configure_llm_mode("replay", args.replay, args.replay_latency)
+
+    with open(args.jd, 'rb') as f:
+        jd_text = extract_text(os.path.basename(args.jd), f.read())
+
+    # An in-memory cache starts empty, so nothing from earlier runs is reused
+    cache = ResultCache(":memory:") if args.no_cache else None
+
+    # Analyze the JD once so each candidate is matched against the same cached profile
+    try:
+        jd_profile = call_with_retry(request_jd_profile, jd_text, cache, max_retries=args.max_retries)
+    except Exception as e:
+        logging.error("Error analyzing job description: %s", e)
+        return 1
+
+    out = sys.stdout if args.out == "-" else open(args.out, 'w', encoding='utf-8')
+    failures = 0
+    try:
+        def emit(record: Dict) -> None:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+        resumes = {}
+        for name, data in iter_resume_documents(args.resumes):
+            try:
+                resumes[name] = extract_text(name, data)
+            except Exception as e:
+                failures += 1
+                emit({"candidate": name, "analysis": None, "error": f"Error reading file: {str(e)}"})
+        if args.ingested:
+            from ingestion import IngestionStore
+
+            store = IngestionStore(args.ingested)
+            # h1b_ingest.py records sources by absolute path
+            for source in [os.path.abspath(source) for source in args.ingested_source] or [None]:
+                resumes.update(store.iter_texts(source))
+
+        if args.top_k is not None:
+            resumes = shortlist(resumes, jd_text, args)
+        logging.info("Screening %d resumes against %s", len(resumes), args.jd)
+
+        if args.pack:
+            results = screen_resume_packs(
+                pack_resumes(resumes),
+                jd_text,
+                partial(request_packed_resume_jd_match, cache=cache, jd_profile=jd_profile),
+                max_concurrency=args.concurrency,
+                max_retries=args.max_retries
+            )
+        else:
+            results = screen_resumes(
+                resumes,
+                jd_text,
+                partial(request_resume_jd_match, cache=cache, jd_profile=jd_profile),
+                max_concurrency=args.concurrency,
+                max_retries=args.max_retries
+            )
+        for result in results:
+            if result["error"]:
+                failures += 1
+            emit(result)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple, Union
+
+import documents
+from candidate_store import make_document_id
+from compaction import normalize_whitespace
+from documents import PAGE_BREAK, SUPPORTED_FILE_TYPES, extract_text, get_file_type
+from metrics import metrics
+
+DEFAULT_INGEST_PATH = "./cache/ingested.sqlite3"
+# Documents extracted or queued per worker; with MAX_DOCUMENT_BYTES this bounds memory use
+IN_FLIGHT_PER_WORKER = 2
+MAX_DOCUMENT_BYTES = 20 * 1024 * 1024
+# Rows written per transaction; an interrupted run redoes at most this many documents
+COMMIT_EVERY = 50
+
+logger = logging.getLogger(__name__)
+
+
+class SourceDocument(NamedTuple):
+    """One document of an ingestion source, read only when it needs extracting
+
+    The fingerprint is cheap to compute without reading the content (size and
+    modification time, or a ZIP entry's CRC) and identifies an unchanged document
+    when an interrupted ingestion is resumed.
+    """
+    name: str
+    fingerprint: str
+    read: Callable[[], bytes]
+    metadata: Dict
+
+
+def _is_supported(name: str) -> bool:
+    base = os.path.basename(name)
+    return bool(base) and not base.startswith(".") and get_file_type(base) in SUPPORTED_FILE_TYPES
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _file_fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def iter_zip_documents(archive: Union[str, IO[bytes]]) -> Iterator[SourceDocument]:
+    """Yield the supported documents in a ZIP archive, decompressing one entry at a time"""
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            # Skip folders and the resource forks macOS adds to archives
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or not _is_supported(info.filename):
+                continue
+            yield SourceDocument(
+                info.filename,
+                f"{info.CRC:08x}-{info.file_size}",
+                lambda info=info: zf.read(info),
+                {"size": info.file_size}
+            )
+
+
+def iter_directory_documents(folder: str) -> Iterator[SourceDocument]:
+    """Yield the supported documents under a folder and its subfolders, in a stable order"""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file_name in sorted(files):
+            if not _is_supported(file_name):
+                continue
+            path = os.path.join(root, file_name)
+            yield SourceDocument(
+                os.path.relpath(path, folder).replace(os.sep, "/"),
+                _file_fingerprint(path),
+                lambda path=path: _read_file(path),
+                {"size": os.path.getsize(path)}
+            )
+
+
+def iter_manifest_documents(manifest: str) -> Iterator[SourceDocument]:
+    """Yield the documents listed in a JSONL manifest, one JSON object per line
+
+    Each line has a "path" (relative to the manifest) or inline "text", and an
+    optional "name"; any other keys (ATS ids, emails, ...) are kept as metadata.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning("Skipping manifest line %d: %s", line_number, e)
+                continue
+            if not isinstance(entry, dict) or ("path" not in entry and "text" not in entry):
+                logger.warning("Skipping manifest line %d: needs a \"path\" or \"text\"", line_number)
+                continue
+
+            metadata = {k: v for k, v in entry.items() if k not in ("name", "path", "text")}
+            if "text" in entry:
+                name = str(entry.get("name") or f"line-{line_number}")
+                # Inline text is always plain text, whatever the name says
+                if get_file_type(name) != "txt":
+                    name = f"{name}.txt"
+                data = str(entry["text"]).encode("utf-8")
+                yield SourceDocument(name, hashlib.sha256(data).hexdigest()[:16], lambda data=data: data, metadata)
+                continue
+
+            path = os.path.join(base_dir, entry["path"])
+            name = str(entry.get("name") or entry["path"])
+            try:
+                fingerprint = _file_fingerprint(path)
+            except OSError as e:
+                logger.warning("Skipping manifest line %d: %s", line_number, e)
+                continue
+            yield SourceDocument(name, fingerprint, lambda path=path: _read_file(path), metadata)
+
+
+def iter_source(path: str) -> Iterator[SourceDocument]:
+    """Documents of a folder, ZIP archive, JSONL manifest or single document file"""
+    if os.path.isdir(path):
+        return iter_directory_documents(path)
+    file_type = get_file_type(path)
+    if file_type == "zip":
+        return iter_zip_documents(path)
+    if file_type == "jsonl":
+        return iter_manifest_documents(path)
+    if file_type in SUPPORTED_FILE_TYPES:
+        return iter([SourceDocument(
+            os.path.basename(path), _file_fingerprint(path), lambda: _read_file(path), {"size": os.path.getsize(path)}
+        )])
+    raise ValueError(f"Unsupported ingestion source: {path}")
+
+
+def _init_worker() -> None:
+    # Pool workers cannot start their own pool for long PDFs, so extract those serially
+    documents.PARALLEL_PAGE_THRESHOLD = float("inf")
+
+
+def extract_normalized_text(name: str, data: bytes) -> str:
+    """Extract a document's text with whitespace collapsed and empty lines removed; runs inside pool workers
+
+    Page breaks are kept so compaction can still recognize page headers and footers.
+    """
+    pages = extract_text(name, data, use_cache=False).split(PAGE_BREAK)
+    return PAGE_BREAK.join("\n".join(normalize_whitespace(page)) for page in pages)
+
+
+def document_key(source: str, name: str) -> str:
+    """Name of an ingested document that stays unique across sources"""
+    return f"{source}/{name}"
+
+
+class IngestionStore:
+    """Persistent SQLite store of extracted document text and metadata, written incrementally
+
+    Rows are keyed by source and document name, so re-ingesting a source only
+    extracts documents that are new or whose fingerprint changed.
+    """
+
+    def __init__(self, path: str = DEFAULT_INGEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                document_id TEXT,
+                text TEXT,
+                metadata TEXT NOT NULL,
+                error TEXT,
+                ingested_at REAL NOT NULL,
+                PRIMARY KEY (source, name)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_id ON documents(document_id)")
+        self._conn.commit()
+
+    def is_current(self, source: str, document: SourceDocument, include_failed: bool = True) -> bool:
+        """Whether this version of the document was already ingested (or already failed, if include_failed)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, error FROM documents WHERE source = ? AND name = ?", (source, document.name)
+            ).fetchone()
+        return row is not None and row["fingerprint"] == document.fingerprint and (include_failed or row["error"] is None)
+
+    def put(
+        self,
+        source: str,
+        document: SourceDocument,
+        text: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Record a document's text, or the error that stopped its extraction; committed in batches"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO documents (
+                    source, name, fingerprint, document_id, text, metadata, error, ingested_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (source, document.name, document.fingerprint, make_document_id(text) if text is not None else None,
+                 text, json.dumps(document.metadata), error, time.time())
+            )
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def prune(self, source: str, keep_names: Set[str]) -> int:
+        """Delete a source's documents that are not in keep_names, returning how many were removed"""
+        with self._lock:
+            names = [row["name"] for row in self._conn.execute("SELECT name FROM documents WHERE source = ?", (source,))]
+            removed = [(source, name) for name in names if name not in keep_names]
+            self._conn.executemany("DELETE FROM documents WHERE source = ? AND name = ?", removed)
+            self._conn.commit()
+            self._pending = 0
+        return len(removed)
+
+    def iter_texts(self, source: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+        """Yield (source/name, text) for every successfully ingested document without loading them all at once
+
+        Keys include the source, so documents with the same name in different
+        archives or folders stay separate.
+        """
+        query = "SELECT source, name, text FROM documents WHERE text IS NOT NULL"
+        params: Tuple = ()
+        if source is not None:
+            query += " AND source = ?"
+            params = (source,)
+        # A separate connection keeps the cursor from holding the store's lock while it is consumed
+        conn = sqlite3.connect(self.path)
+        try:
+            for document_source, name, text in conn.execute(query + " ORDER BY source, name", params):
+                yield document_key(document_source, name), text
+        finally:
+            conn.close()
+
+    def get(self, source: str, name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE source = ? AND name = ?", (source, name)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["metadata"] = json.loads(record["metadata"])
+        return record
+
+    def counts(self, source: Optional[str] = None) -> Dict[str, int]:
+        """Numbers of ingested and failed documents, optionally for one source"""
+        where, params = ("WHERE source = ?", (source,)) if source is not None else ("", ())
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(text) AS ingested, COUNT(error) AS failed FROM documents {where}", params
+            ).fetchone()
+        return {"ingested": row["ingested"], "failed": row["failed"]}
+
+
+def ingest(
+    documents_iter: Iterable[SourceDocument],
+    store: IngestionStore,
+    source: str,
+    workers: Optional[int] = None,
+    retry_failed: bool = False,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    index_fn: Optional[Callable[[Dict[str, str]], Any]] = None
+) -> Dict[str, int]:
+    """Extract documents across a process pool and write each result to the store as it finishes
+
+    Only a bounded number of documents are read and in flight at once, so memory
+    does not grow with the size of the source. Documents already in the store with
+    the same fingerprint are skipped, which makes an interrupted run resumable;
+    documents that failed before are only retried with retry_failed. Once the
+    whole source has been read, documents no longer in it are removed from the
+    store. Returns counts of ingested, skipped, failed and removed documents.
+
+    index_fn, when given, is called with batches of newly extracted documents as
+    {source/name: text}, e.g. to embed them into the resume index as they are stored.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {"ingested": 0, "skipped": 0, "failed": 0, "removed": 0}
+    seen: Set[str] = set()
+    in_flight: Dict[Future, SourceDocument] = {}
+    to_index: Dict[str, str] = {}
+
+    def record(document: SourceDocument, text: Optional[str] = None, error: Optional[str] = None) -> None:
+        store.put(source, document, text=text, error=error)
+        if index_fn is not None and text is not None:
+            to_index[document_key(source, document.name)] = text
+        stats["failed" if error else "ingested"] += 1
+        metrics.inc("ingested_documents_total", status="failed" if error else "ingested")
+        if on_progress:
+            on_progress(dict(stats, name=document.name))
+
+    def drain(done: Set[Future]) -> None:
+        for future in done:
+            document = in_flight.pop(future)
+            try:
+                record(document, text=future.result())
+            except Exception as e:
+                record(document, error=str(e))
+
+    with metrics.span("ingest"), ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        try:
+            for document in documents_iter:
+                seen.add(document.name)
+                if store.is_current(source, document, include_failed=not retry_failed):
+                    stats["skipped"] += 1
+                    continue
+                if document.metadata.get("size", 0) > MAX_DOCUMENT_BYTES:
+                    record(document, error=f"Document is larger than {MAX_DOCUMENT_BYTES} bytes")
+                    continue
+                try:
+                    data = document.read()
+                except (OSError, zipfile.BadZipFile) as e:
+                    record(document, error=f"Error reading file: {e}")
+                    continue
+
+                in_flight[pool.submit(extract_normalized_text, document.name, data)] = document
+                if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    drain(done)
+                if len(to_index) >= COMMIT_EVERY:
+                    index_fn(to_index)
+                    to_index.clear()
+            drain(set(in_flight))
+        finally:
+            try:
+                # Documents stored by an interrupted run are skipped next time, so they are indexed now
+                if to_index:
+                    index_fn(to_index)
+            finally:
+                store.flush()
+    # Only reached when the source was read to the end, so an interrupted run never prunes
+    stats["removed"] = store.prune(source, seen)
+    return stats
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import metrics
+
+DEFAULT_QUEUE_PATH = "./cache/jobs.sqlite3"
+DEFAULT_WORKERS = 4
+POLL_INTERVAL_SECONDS = 0.5
+# A running job whose worker has not reported within the lease is assumed lost and retried
+LEASE_SECONDS = 300
+# Workers renew the lease of the job they are running this often, however long its handler takes
+HEARTBEAT_SECONDS = LEASE_SECONDS / 5
+MAX_ATTEMPTS = 3
+# Resubmitting an identical job within this window returns the existing job instead of redoing it
+DEDUPE_SECONDS = 60 * 60
+RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict, Callable[[Dict], None]], Any]
+
+
+class JobQueue:
+    """Persistent SQLite-backed queue of analysis jobs shared by all sessions and worker threads"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                dedupe_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                partial TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs(dedupe_key, created_at)")
+        self._conn.commit()
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        """Queue a job and return its id, reusing a recent identical job that has not failed"""
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        dedupe_key = hashlib.sha256(f"{kind}:{encoded}".encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT id FROM jobs WHERE dedupe_key = ? AND status != ? AND created_at > ?
+                ORDER BY created_at DESC LIMIT 1
+                """,
+                (dedupe_key, FAILED, now - DEDUPE_SECONDS)
+            ).fetchone()
+            if row is not None:
+                return row["id"]
+
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, kind, dedupe_key, payload, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, kind, dedupe_key, encoded, QUEUED, now)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - RETENTION_SECONDS)
+            )
+            self._conn.commit()
+        metrics.inc("jobs_total", kind=kind, status="submitted")
+        return job_id
+
+    def claim(self) -> Optional[Dict]:
+        """Take the oldest runnable job, or one whose worker's lease expired, and mark it running
+
+        The returned job's "attempt" identifies this claim; updates made with an
+        older attempt, by a worker whose lease was taken over, are ignored.
+        """
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE keeps other processes sharing the database from claiming the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE status = ? OR (status = ? AND lease_expires_at < ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.commit()
+                    return None
+                if row["attempts"] >= MAX_ATTEMPTS:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Job was abandoned by its worker too many times", now, row["id"])
+                    )
+                    self._conn.commit()
+                    return None
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, started_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, now + LEASE_SECONDS, now, row["id"])
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        metrics.observe("job_queue_wait", now - row["created_at"], kind=row["kind"])
+        return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"]), "attempt": row["attempts"] + 1}
+
+    def _update_owned(self, job_id: str, attempt: Optional[int], assignments: str, values: tuple) -> bool:
+        """Update a running job if it is still held by the given attempt (any attempt when None)"""
+        query = f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ?"
+        params = values + (job_id, RUNNING)
+        if attempt is not None:
+            query += " AND attempts = ?"
+            params += (attempt,)
+        with self._lock:
+            updated = self._conn.execute(query, params).rowcount
+            self._conn.commit()
+        return updated > 0
+
+    def extend_lease(self, job_id: str, attempt: Optional[int] = None) -> bool:
+        """Renew the lease of a running job, returning False if the job is no longer owned"""
+        return self._update_owned(job_id, attempt, "lease_expires_at = ?", (time.time() + LEASE_SECONDS,))
+
+    def update_partial(self, job_id: str, partial: Dict, attempt: Optional[int] = None) -> bool:
+        """Publish intermediate results of a running job and extend its lease"""
+        return self._update_owned(
+            job_id, attempt, "partial = ?, lease_expires_at = ?", (json.dumps(partial), time.time() + LEASE_SECONDS)
+        )
+
+    def complete(self, job_id: str, result: Any, attempt: Optional[int] = None) -> bool:
+        """Store a job's result, returning False (and storing nothing) if the job is no longer owned"""
+        return self._update_owned(
+            job_id, attempt, "status = ?, result = ?, finished_at = ?", (DONE, json.dumps(result), time.time())
+        )
+
+    def fail(self, job_id: str, error: str, attempt: Optional[int] = None) -> bool:
+        """Mark a job failed, returning False if it is no longer owned"""
+        return self._update_owned(job_id, attempt, "status = ?, error = ?, finished_at = ?", (FAILED, error, time.time()))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current state of a job: payload, status, partial and final results, error and timings"""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT id, kind, payload, status, partial, result, error, attempts, created_at, started_at, finished_at
+                FROM jobs WHERE id = ?
+                """,
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["partial"] = json.loads(job["partial"]) if job["partial"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+
+class JobWorkerPool:
+    """Background threads that run queued jobs with the handler registered for their kind
+
+    handler(payload, report_partial) returns the job result; report_partial(dict)
+    publishes intermediate results for pollers. A raised exception fails the job.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        workers: int = DEFAULT_WORKERS,
+        poll_interval: float = POLL_INTERVAL_SECONDS
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    def start(self) -> "JobWorkerPool":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.OperationalError as e:
+                # Another process holds the write lock; try again on the next poll
+                logger.debug("Could not claim a job: %s", e)
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict) -> None:
+        job_id, attempt = job["id"], job["attempt"]
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.queue.fail(job_id, f"No handler for job kind: {job['kind']}", attempt)
+            return
+
+        # Handlers may spend minutes in retry backoff without reporting, so the lease is renewed meanwhile
+        finished = threading.Event()
+
+        def heartbeat() -> None:
+            while not finished.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not self.queue.extend_lease(job_id, attempt):
+                        return
+                except sqlite3.OperationalError as e:
+                    logger.debug("Could not renew the lease of job %s: %s", job_id, e)
+
+        threading.Thread(target=heartbeat, name=f"job-heartbeat-{job_id[:8]}", daemon=True).start()
+        try:
+            with metrics.span("job_run", kind=job["kind"]):
+                result = handler(job["payload"], lambda partial: self.queue.update_partial(job_id, partial, attempt))
+        except json.JSONDecodeError as e:
+            # Keep the raw model output so the UI can show what was returned
+            owned = self.queue.fail(job_id, f"Error parsing JSON response: {e}\nRaw response: {e.doc}", attempt)
+            status = FAILED
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, job["kind"])
+            owned = self.queue.fail(job_id, str(e), attempt)
+            status = FAILED
+        else:
+            owned = self.queue.complete(job_id, result, attempt)
+            status = DONE
+        finally:
+            finished.set()
+
+        if owned:
+            metrics.inc("jobs_total", kind=job["kind"], status=status)
+        else:
+            logger.warning("Job %s (%s) was taken over by another worker; discarding this result", job_id, job["kind"])
@@ -0,0 +1,208 @@
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+CLOSERS = {"{": "}", "[": "]"}
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+# Cut points tried when repairing truncated output, newest first
+MAX_TRUNCATION_ATTEMPTS = 64
+
+
+class Field(NamedTuple):
+    """Expected type of one response field, with the value used when it is missing or invalid"""
+    type: type
+    default: Any = None
+    choices: Optional[Tuple[str, ...]] = None
+    required: bool = False
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, Tuple[str, ...]]], bool]:
+    """Walk one JSON value, dropping trailing commas and recording where it could be cut
+
+    Returns the cleaned text, the closers still open, whether it stopped inside a
+    string, the cut points (length of cleaned text, closers open there), and
+    whether the value closed. Cut points only fall right after a container opens
+    or a complete value ends, never inside a number, literal or string.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = False
+    string_is_key = False
+    escaped = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    cuts.append((len(out), tuple(stack)))
+            continue
+        if char == '"':
+            in_string = True
+            previous = next((c for c in reversed(out) if not c.isspace()), "")
+            string_is_key = bool(stack) and stack[-1] == "}" and previous in "{,"
+        elif char in CLOSERS:
+            stack.append(CLOSERS[char])
+            out.append(char)
+            cuts.append((len(out), tuple(stack)))
+            continue
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                return "".join(out), stack, False, cuts, True
+            cuts.append((len(out), tuple(stack)))
+            continue
+        elif char == ",":
+            cuts.append((len(out), tuple(stack)))
+        out.append(char)
+    return "".join(out), stack, in_string, cuts, False
+
+
+def strip_fences(text: str) -> str:
+    """Remove a surrounding ```json fence, if any"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def extract_json(text: str) -> Any:
+    """Parse JSON from LLM output, tolerating fences, surrounding prose, trailing commas and truncation
+
+    Truncated output is closed after the last complete value, so every complete
+    field before the cut is kept and a number or string cut off mid-token is
+    dropped rather than accepted. Raises json.JSONDecodeError when no JSON value
+    can be recovered.
+    """
+    text = text or ""
+    try:
+        return json.loads(strip_fences(text))
+    except json.JSONDecodeError:
+        pass
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise json.JSONDecodeError("No JSON object found in response", text, 0)
+    start = min(starts)
+
+    cleaned, _, _, cuts, complete = _scan(text[start:])
+    if complete:
+        return json.loads(cleaned)
+
+    for length, open_closers in reversed(cuts[-MAX_TRUNCATION_ATTEMPTS:]):
+        try:
+            return json.loads(cleaned[:length].rstrip().rstrip(",") + "".join(reversed(open_closers)))
+        except json.JSONDecodeError:
+            continue
+    raise json.JSONDecodeError("Could not recover JSON from truncated response", text, start)
+
+
+def loads_tolerant(text: str) -> Any:
+    """json.loads that falls back to extract_json for malformed values"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return extract_json(text)
+
+
+def _coerce(value: Any, field: Field) -> Tuple[Any, bool]:
+    """Convert value to the field's type, returning (value, ok)"""
+    if field.type in (int, float):
+        if isinstance(value, bool):
+            return field.default, False
+        if isinstance(value, (int, float)):
+            return value, True
+        if isinstance(value, str):
+            match = NUMBER_PATTERN.search(value)
+            if match:
+                number = float(match.group())
+                return int(number) if number.is_integer() else number, True
+        return field.default, False
+    if field.type is bool:
+        if isinstance(value, bool):
+            return value, True
+        if isinstance(value, str) and value.strip().lower() in ("true", "yes"):
+            return True, True
+        if isinstance(value, str) and value.strip().lower() in ("false", "no"):
+            return False, True
+        return field.default, False
+    if field.type is str:
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            return field.default, False
+        if field.choices:
+            value = value.strip().upper()
+            if value not in field.choices:
+                return field.default, False
+        return value, True
+    if field.type is list:
+        if isinstance(value, list):
+            return value, True
+        if isinstance(value, str):
+            return ([value] if value.strip() else []), True
+        return field.default, False
+    return (value, True) if isinstance(value, field.type) else (field.default, False)
+
+
+def validate(data: Any, schema: Dict, path: str = "") -> Tuple[Dict, List[str], List[str]]:
+    """Check data against a schema of nested dicts with Field leaves, filling defaults
+
+    Returns the validated copy (unknown keys are kept), the dotted paths of
+    missing or invalid fields, and the subset of those that are required.
+    """
+    if not isinstance(data, dict):
+        data = {}
+    result = dict(data)
+    problems: List[str] = []
+    required: List[str] = []
+    for key, spec in schema.items():
+        field_path = f"{path}{key}"
+        if isinstance(spec, dict):
+            if not isinstance(data.get(key), dict):
+                problems.append(field_path)
+            result[key], sub_problems, sub_required = validate(data.get(key), spec, f"{field_path}.")
+            problems.extend(sub_problems)
+            required.extend(sub_required)
+            continue
+
+        ok = False
+        if data.get(key) is not None:
+            value, ok = _coerce(data[key], spec)
+        # Copy list defaults so results never share a mutable default
+        result[key] = value if ok else (list(spec.default) if isinstance(spec.default, list) else spec.default)
+        if not ok:
+            problems.append(field_path)
+            if spec.required:
+                required.append(field_path)
+    return result, problems, required
+
+
+def describe_schema(schema: Dict, indent: int = 0) -> str:
+    """Render a schema as the JSON template shown to the model in repair requests"""
+    pad = " " * (indent + 4)
+    lines = []
+    for key, spec in schema.items():
+        if isinstance(spec, dict):
+            value = describe_schema(spec, indent + 4)
+        elif spec.choices:
+            value = "<string: " + "|".join(f'"{choice}"' for choice in spec.choices) + ">"
+        else:
+            value = {int: "<number>", float: "<number>", bool: "<boolean>", str: "<string>", list: "[<string>]"}[spec.type]
+        lines.append(f'{pad}"{key}": {value}')
+    return "{\n" + ",\n".join(lines) + "\n" + " " * indent + "}"
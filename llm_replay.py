@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_RECORDING_PATH = "./cache/llm_recording.jsonl"
+LLM_MODES = ["live", "record", "replay"]
+# Request options that do not change the response and are left out of the request hash
+UNHASHED_OPTIONS = {"stream_options", "timeout", "extra_headers", "extra_query", "extra_body"}
+
+# Clock the date-dependent parts of the current request were built with, recorded next to it
+_request_clock: ContextVar[Optional[datetime]] = ContextVar("request_clock", default=None)
+
+
+class ReplayMissError(KeyError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+def request_key(request: Dict) -> str:
+    """Stable hash of a chat completion request, independent of key order"""
+    hashed = {key: value for key, value in request.items() if key not in UNHASHED_OPTIONS}
+    encoded = json.dumps(hashed, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def request_clock(clock: datetime) -> Iterator[None]:
+    """Record clock with the LLM calls made inside the block, so replay can rebuild them as of that time"""
+    token = _request_clock.set(clock)
+    try:
+        yield
+    finally:
+        _request_clock.reset(token)
+
+
+def to_plain(value: Any) -> Any:
+    """Convert an OpenAI response object (or a stand-in) to JSON-serializable data"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def to_namespace(value: Any) -> Any:
+    """Rebuild attribute access (response.choices[0].message.content) from recorded data"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [to_namespace(item) for item in value]
+    return value
+
+
+class RecordingClient:
+    """Wraps an OpenAI client and appends every chat completion request/response pair to a JSONL file
+
+    Streamed responses are recorded chunk by chunk with their arrival times,
+    once the stream has been read to the end.
+    """
+
+    def __init__(self, client, path: str = DEFAULT_RECORDING_PATH):
+        self.client = client
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        start = time.perf_counter()
+        clock = _request_clock.get()
+        response = self.client.chat.completions.create(**request)
+        if request.get("stream"):
+            return self._record_stream(request, response, start, clock)
+        self._append(request, {"response": to_plain(response), "latency_s": time.perf_counter() - start}, clock)
+        return response
+
+    def _record_stream(self, request: Dict, response, start: float, clock: Optional[datetime]) -> Iterator:
+        chunks: List[Dict] = []
+        offsets: List[float] = []
+        for chunk in response:
+            offsets.append(time.perf_counter() - start)
+            chunks.append(to_plain(chunk))
+            yield chunk
+        self._append(request, {"chunks": chunks, "offsets_s": offsets, "latency_s": time.perf_counter() - start}, clock)
+
+    def _append(self, request: Dict, entry: Dict, clock: Optional[datetime] = None) -> None:
+        header = {"key": request_key(request), "request": request, "recorded_at": time.time()}
+        if clock is not None:
+            header["clock"] = clock.isoformat()
+        line = json.dumps(dict(header, **entry), default=str)
+        # One write per line keeps the file append-only and readable while it grows
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+class ReplayClient:
+    """Serves recorded chat completions by request hash, without network access or an API key
+
+    Repeated recordings of the same request are replayed in the order they were
+    recorded, cycling when exhausted. latency_scale=1 sleeps for the recorded
+    latency (and chunk timing for streams), 0 replays at full speed.
+
+    clocks lists, newest first, the distinct clocks that date-dependent
+    requests were recorded with; such a request hashes like its recording only
+    when it is rebuilt with its own clock.
+    """
+
+    def __init__(self, path: str = DEFAULT_RECORDING_PATH, latency_scale: float = 0.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self._entries: Dict[str, List[Dict]] = defaultdict(list)
+        self._next: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        clocks = set()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A recording interrupted mid-write leaves a partial last line
+                    continue
+                self._entries[entry["key"]].append(entry)
+                if entry.get("clock"):
+                    clocks.add(datetime.fromisoformat(entry["clock"]))
+        self.clocks: List[datetime] = sorted(clocks, reverse=True)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def has(self, request: Dict) -> bool:
+        """Whether a response to this request was recorded"""
+        return request_key(request) in self._entries
+
+    def create(self, **request):
+        key = request_key(request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise ReplayMissError(f"No recorded response for request {key[:12]} in {self.path}")
+            entry = entries[self._next[key] % len(entries)]
+            self._next[key] += 1
+
+        if "chunks" in entry:
+            return self._replay_stream(entry)
+        if self.latency_scale:
+            time.sleep(entry["latency_s"] * self.latency_scale)
+        return to_namespace(entry["response"])
+
+    def _replay_stream(self, entry: Dict) -> Iterator:
+        start = time.perf_counter()
+        for chunk, offset in zip(entry["chunks"], entry["offsets_s"]):
+            if self.latency_scale:
+                delay = offset * self.latency_scale - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield to_namespace(chunk)
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+METRIC_PREFIX = "h1b"
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+# Recent samples kept per stage for the percentiles shown in the debug panel
+RECENT_SAMPLES = 1000
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class MetricsRegistry:
+    """Thread-safe store of stage timings, token usage and cache counters"""
+
+    def __init__(self, log_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[LabelKey, Dict] = {}
+        self._recent: Dict[LabelKey, deque] = {}
+        self.log_path = log_path
+
+    def observe(self, stage: str, seconds: float, **labels) -> None:
+        """Record the duration of one pipeline stage"""
+        key = _label_key({"stage": stage, **labels})
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            self._recent.setdefault(key, deque(maxlen=RECENT_SAMPLES)).append(seconds)
+        self._log({"type": "span", "stage": stage, "seconds": round(seconds, 6), **labels})
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name][_label_key(labels)] += amount
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """Time the enclosed block as a pipeline stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def record_usage(self, call: str, usage) -> None:
+        """Record prompt and completion tokens from an OpenAI response.usage object"""
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.inc("llm_tokens_total", prompt_tokens, call=call, kind="prompt")
+        self.inc("llm_tokens_total", completion_tokens, call=call, kind="completion")
+        self.inc("llm_requests_total", call=call)
+        self._log({"type": "usage", "call": call, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Count a cache lookup as a hit or a miss"""
+        self.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            if self._histograms:
+                name = f"{METRIC_PREFIX}_stage_duration_seconds"
+                lines.append(f"# HELP {name} Duration of screening pipeline stages.")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms.items()):
+                    for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, {'le': str(bound)})} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {histogram['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram['count']}")
+            for counter, series in sorted(self._counters.items()):
+                name = f"{METRIC_PREFIX}_{counter}"
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """Summaries for display: per-stage latency stats and counter values"""
+        with self._lock:
+            stages = []
+            for key, histogram in sorted(self._histograms.items()):
+                recent = list(self._recent[key])
+                stages.append({
+                    **dict(key),
+                    "count": histogram["count"],
+                    "mean_ms": histogram["sum"] / histogram["count"] * 1000,
+                    "p50_ms": _percentile(recent, 50) * 1000,
+                    "p95_ms": _percentile(recent, 95) * 1000
+                })
+            counters = [
+                {"metric": name, **dict(key), "value": value}
+                for name, series in sorted(self._counters.items())
+                for key, value in sorted(series.items())
+            ]
+        return {"stages": stages, "counters": counters}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._recent.clear()
+
+    def _log(self, event: Dict) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps({"ts": time.time(), **event}) + "\n"
+        with self._lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+# Process-wide registry used by the pipeline; H1B_METRICS_LOG enables the JSONL event log
+metrics = MetricsRegistry(log_path=os.environ.get("H1B_METRICS_LOG"))
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry = metrics, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve GET /metrics in Prometheus text format from a background thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,240 @@
+import json
+import os
+import tempfile
+import time
+from typing import IO, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_OUTCOME_PATH = "./cache/outcomes.parquet"
+DEFAULT_CALIBRATION_PATH = "./cache/calibration.json"
+
+OUTCOMES = ["APPROVED", "RFE", "DENIED"]
+FEATURE_COLUMNS = ["confidence_score", "match_percentage", "is_stem_degree", "visa_status"]
+OUTCOME_COLUMNS = ["candidate", "jd_id"] + FEATURE_COLUMNS + ["outcome", "decided_at"]
+
+# Below this many outcomes (or without both approvals and non-approvals) no calibration is fitted
+MIN_TRAINING_OUTCOMES = 30
+L2_PENALTY = 1.0
+MAX_ITERATIONS = 50
+TRUTHY = {"true", "yes", "y", "1", "1.0"}
+
+
+def _as_flag(values: pd.Series) -> pd.Series:
+    """Vectorized truthiness for booleans and their CSV spellings ("True", "yes", "1")"""
+    return values.astype(str).str.strip().str.lower().isin(TRUTHY)
+
+
+def normalize_outcomes(frame: pd.DataFrame) -> pd.DataFrame:
+    """Coerce an outcome table to the store's columns and types, dropping rows without a known outcome"""
+    missing = [column for column in ("confidence_score", "outcome") if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Outcome data is missing required columns: {', '.join(missing)}")
+
+    frame = frame.reindex(columns=OUTCOME_COLUMNS).copy()
+    frame["outcome"] = frame["outcome"].astype(str).str.strip().str.upper()
+    frame = frame[frame["outcome"].isin(OUTCOMES)]
+    for column in ("confidence_score", "match_percentage", "decided_at"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    frame["is_stem_degree"] = _as_flag(frame["is_stem_degree"])
+    frame["visa_status"] = frame["visa_status"].fillna("Unknown").astype(str)
+    for column in ("candidate", "jd_id"):
+        frame[column] = frame[column].astype("string")
+    return frame.reset_index(drop=True)
+
+
+def read_outcomes(source: Union[str, IO[bytes]]) -> pd.DataFrame:
+    """Load past assessments and their outcomes from a CSV or Parquet file path or upload"""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if name.lower().endswith(".parquet"):
+        return normalize_outcomes(pd.read_parquet(source))
+    return normalize_outcomes(pd.read_csv(source))
+
+
+class OutcomeStore:
+    """Local columnar store of past assessments and their real outcomes (approved, RFE, denied)
+
+    The table is kept as one Parquet file (or CSV, by extension) and rewritten
+    atomically on each import. A later outcome for the same candidate and job
+    replaces the earlier one.
+    """
+
+    def __init__(self, path: str = DEFAULT_OUTCOME_PATH):
+        self.path = path
+
+    def load(self) -> pd.DataFrame:
+        if not os.path.exists(self.path):
+            return normalize_outcomes(pd.DataFrame(columns=OUTCOME_COLUMNS))
+        return read_outcomes(self.path)
+
+    def add(self, outcomes: Union[pd.DataFrame, Sequence[Dict]]) -> int:
+        """Append outcome rows and return how many rows the store holds afterwards"""
+        new = normalize_outcomes(pd.DataFrame(outcomes))
+        new["decided_at"] = new["decided_at"].fillna(time.time())
+        frame = pd.concat([self.load(), new], ignore_index=True)
+
+        keyed = frame["candidate"].notna() & frame["jd_id"].notna()
+        deduped = frame[keyed].drop_duplicates(["candidate", "jd_id"], keep="last")
+        frame = pd.concat([deduped, frame[~keyed]], ignore_index=True)
+        self._write(frame)
+        return len(frame)
+
+    def import_file(self, source: Union[str, IO[bytes]]) -> int:
+        return self.add(read_outcomes(source))
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            if self.path.lower().endswith(".parquet"):
+                frame.to_parquet(tmp_path, index=False)
+            else:
+                frame.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def _fit_logistic(X: np.ndarray, y: np.ndarray, l2: float) -> np.ndarray:
+    """L2-regularized logistic regression by Newton-Raphson (IRLS); the intercept is not penalized"""
+    weights = np.zeros(X.shape[1])
+    penalty = np.full(X.shape[1], l2)
+    penalty[0] = 0.0
+    for _ in range(MAX_ITERATIONS):
+        p = _sigmoid(X @ weights)
+        gradient = X.T @ (p - y) + penalty * weights
+        hessian = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty + 1e-9)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-6:
+            break
+    return weights
+
+
+class Calibration:
+    """Maps raw LLM confidence, match percentage, STEM flag and visa status to outcome probabilities
+
+    One logistic model per outcome is fitted on the outcome store; their
+    probabilities are normalized to sum to one. Scoring builds a single design
+    matrix for the whole batch, so it is one matrix product regardless of size.
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        visa_statuses: List[str],
+        fill_values: Dict[str, float],
+        metrics: Optional[Dict] = None
+    ):
+        self.weights = np.asarray(weights, dtype=float)
+        self.visa_statuses = list(visa_statuses)
+        self.fill_values = fill_values
+        self.metrics = metrics or {}
+
+    @staticmethod
+    def _raw_features(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+        def column(name: str) -> pd.Series:
+            return frame[name] if name in frame.columns else pd.Series(np.nan, index=frame.index)
+
+        match = pd.to_numeric(column("match_percentage"), errors="coerce").to_numpy(float) / 100
+        confidence = pd.to_numeric(column("confidence_score"), errors="coerce").to_numpy(float) / 100
+        stem = _as_flag(column("is_stem_degree")).to_numpy(float)
+        visa_status = column("visa_status").fillna("Unknown").astype(str).to_numpy()
+        return {"confidence": confidence, "match": match, "stem": stem, "visa_status": visa_status}
+
+    def design_matrix(self, frame: pd.DataFrame) -> np.ndarray:
+        features = self._raw_features(frame)
+        # Like the leaderboard score, a missing confidence falls back to the match percentage
+        confidence = np.where(np.isnan(features["confidence"]), features["match"], features["confidence"])
+        confidence = np.where(np.isnan(confidence), self.fill_values["confidence"], confidence)
+        match = np.where(np.isnan(features["match"]), self.fill_values["match"], features["match"])
+        visa = (features["visa_status"][:, None] == np.array(self.visa_statuses, dtype=object)[None, :]).astype(float)
+        return np.column_stack([np.ones(len(frame)), confidence, match, features["stem"], visa])
+
+    def predict_proba(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Probability of each outcome for every row, as columns named after OUTCOMES"""
+        if frame.empty:
+            return pd.DataFrame(columns=OUTCOMES, dtype=float)
+        scores = _sigmoid(self.design_matrix(frame) @ self.weights)
+        return pd.DataFrame(scores / scores.sum(axis=1, keepdims=True), columns=OUTCOMES, index=frame.index)
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        """Calibrated approval probability (0-1) for every row"""
+        return self.predict_proba(frame)["APPROVED"].to_numpy()
+
+    def to_dict(self) -> Dict:
+        return {
+            "weights": self.weights.tolist(),
+            "visa_statuses": self.visa_statuses,
+            "fill_values": self.fill_values,
+            "metrics": self.metrics
+        }
+
+    def save(self, path: str = DEFAULT_CALIBRATION_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CALIBRATION_PATH) -> Optional["Calibration"]:
+        """Saved calibration, or None if none has been fitted yet"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return cls(data["weights"], data["visa_statuses"], data["fill_values"], data.get("metrics"))
+
+
+def _brier(probabilities: np.ndarray, approved: np.ndarray) -> float:
+    return float(np.mean((probabilities - approved) ** 2))
+
+
+def fit_calibration(outcomes: pd.DataFrame, l2: float = L2_PENALTY) -> Calibration:
+    """Fit a calibration on past outcomes, raising ValueError when there are too few to learn from
+
+    The returned calibration's metrics compare the Brier score of the raw LLM
+    confidence with that of the calibrated approval probability on the same data.
+    """
+    outcomes = normalize_outcomes(outcomes)
+    approved = (outcomes["outcome"] == "APPROVED").to_numpy(float)
+    if len(outcomes) < MIN_TRAINING_OUTCOMES or approved.min() == approved.max():
+        raise ValueError(
+            f"Need at least {MIN_TRAINING_OUTCOMES} outcomes including both approvals and non-approvals "
+            f"to calibrate; have {len(outcomes)}"
+        )
+
+    raw = Calibration._raw_features(outcomes)
+    # Missing inputs at scoring time are replaced by the training mean
+    fill_values = {
+        name: float(np.nanmean(raw[name])) if not np.isnan(raw[name]).all() else 0.5
+        for name in ("confidence", "match")
+    }
+    visa_statuses = sorted(outcomes["visa_status"].unique())
+    calibration = Calibration(np.zeros((4 + len(visa_statuses), len(OUTCOMES))), visa_statuses, fill_values)
+
+    X = calibration.design_matrix(outcomes)
+    labels = outcomes["outcome"].to_numpy()
+    calibration.weights = np.column_stack([
+        _fit_logistic(X, (labels == outcome).astype(float), l2) for outcome in OUTCOMES
+    ])
+
+    raw_confidence = np.where(np.isnan(raw["confidence"]), fill_values["confidence"], raw["confidence"])
+    calibration.metrics = {
+        "trained_on": len(outcomes),
+        "approval_rate": float(approved.mean()),
+        "brier_raw": _brier(np.clip(raw_confidence, 0, 1), approved),
+        "brier_calibrated": _brier(calibration.predict(outcomes), approved)
+    }
+    return calibration
@@ -0,0 +1,213 @@
+import hashlib
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from chromadb.utils import embedding_functions
+
+from result_cache import normalize_text
+
+RESUME_COLLECTION = "resumes"
+JOB_PROFILE_COLLECTION = "job_profiles"
+DEFAULT_TOP_K = 20
+DEFAULT_TOP_K_JOBS = 10
+HASH_EMBEDDING_DIM = 512
+SENTENCE_TRANSFORMER_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BACKENDS = ["hash", "sentence-transformer"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9]+)*")
+
+
+class HashEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Deterministic feature-hashing embedding that needs no model download or network access"""
+
+    def __init__(self, dim: int = HASH_EMBEDDING_DIM):
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in input]
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        # Unigrams capture skills, bigrams capture phrases like "machine learning"
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if (digest >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    @staticmethod
+    def name() -> str:
+        return "h1b_hash"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(dim=config.get("dim", HASH_EMBEDDING_DIM))
+
+
+try:
+    from chromadb.utils.embedding_functions import register_embedding_function
+    register_embedding_function(HashEmbeddingFunction)
+except (ImportError, ValueError):
+    # Older chromadb releases have no registry; re-registering on reload raises ValueError
+    pass
+
+
+def get_embedding_function(backend: str = "hash"):
+    """Create the embedding function for a backend name from EMBEDDING_BACKENDS"""
+    if backend == "hash":
+        return HashEmbeddingFunction()
+    elif backend == "sentence-transformer":
+        # Runs locally; the model is downloaded once and then served from the local cache
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=SENTENCE_TRANSFORMER_MODEL)
+    else:
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+
+
+def get_resume_collection(chroma_client, backend: str = "hash"):
+    """Get or create the resume collection for an embedding backend"""
+    # Vectors from different backends are not comparable, so each gets its own collection
+    return chroma_client.get_or_create_collection(
+        name=f"{RESUME_COLLECTION}_{backend.replace('-', '_')}",
+        embedding_function=get_embedding_function(backend),
+        metadata={"hnsw:space": "cosine"}
+    )
+
+
+def get_job_profile_collection(chroma_client, backend: str = "hash"):
+    """Get or create the collection of JD requirement profiles for an embedding backend"""
+    return chroma_client.get_or_create_collection(
+        name=f"{JOB_PROFILE_COLLECTION}_{backend.replace('-', '_')}",
+        embedding_function=get_embedding_function(backend),
+        metadata={"hnsw:space": "cosine"}
+    )
+
+
+def make_resume_id(resume_text: str) -> str:
+    """Content-addressed id so re-ingesting the same resume does not duplicate it"""
+    return hashlib.sha256(normalize_text(resume_text).encode("utf-8")).hexdigest()
+
+
+def index_resumes(collection, resumes: Dict[str, str]) -> Dict[str, str]:
+    """Embed and upsert resumes keyed by candidate name, returning candidate name -> resume id
+
+    Candidates with identical resumes (the same file under two names) share
+    one id and are embedded once, under the first candidate's name. Resumes
+    already in the index are not embedded again, so re-indexing a pool only
+    costs as much as its new resumes.
+    """
+    resume_ids = {candidate: make_resume_id(text) for candidate, text in resumes.items() if text}
+    # Chroma rejects an upsert that repeats an id
+    unique: Dict[str, str] = {}
+    for candidate, resume_id in resume_ids.items():
+        unique.setdefault(resume_id, candidate)
+    if unique:
+        for resume_id in collection.get(ids=list(unique), include=[])["ids"]:
+            del unique[resume_id]
+    if unique:
+        collection.upsert(
+            ids=list(unique),
+            documents=[resumes[candidate] for candidate in unique.values()],
+            metadatas=[{"candidate": candidate, "resume_id": resume_id} for resume_id, candidate in unique.items()]
+        )
+    return resume_ids
+
+
+def shortlist_resumes(
+    collection,
+    jd_text: str,
+    top_k: int = DEFAULT_TOP_K,
+    resume_ids: Optional[List[str]] = None
+) -> List[Dict]:
+    """Return the top_k resumes closest to a JD, optionally restricted to the given resume ids
+
+    Each item has the keys "resume_id", "candidate", "resume_text" and
+    "similarity", ordered from most to least similar.
+    """
+    if top_k <= 0 or collection.count() == 0 or resume_ids == []:
+        return []
+
+    where = {"resume_id": {"$in": list(resume_ids)}} if resume_ids is not None else None
+
+    results = collection.query(
+        query_texts=[jd_text],
+        n_results=min(top_k, collection.count()),
+        where=where,
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        {
+            "resume_id": resume_id,
+            "candidate": metadata.get("candidate", resume_id),
+            "resume_text": document,
+            "similarity": 1.0 - distance
+        }
+        for resume_id, document, metadata, distance in zip(
+            results["ids"][0],
+            results["documents"][0],
+            results["metadatas"][0],
+            results["distances"][0]
+        )
+    ]
+
+
+def index_job_profiles(collection, jobs: List[Dict], format_profile: Callable[[Dict], str]) -> int:
+    """Embed the profiles of jobs that are new or whose profile changed, returning how many were (re)indexed
+
+    Each job is a dict with "jd_id", "title" and "profile"; format_profile renders
+    a profile as the text that is embedded. A hash of that text is kept in the
+    metadata, so an updated profile replaces its stale embedding.
+    """
+    if not jobs:
+        return 0
+    documents = {job["jd_id"]: format_profile(job["profile"]) for job in jobs}
+    hashes = {jd_id: hashlib.sha256(document.encode("utf-8")).hexdigest() for jd_id, document in documents.items()}
+    indexed = collection.get(ids=list(documents), include=["metadatas"])
+    indexed_hashes = {
+        jd_id: (metadata or {}).get("profile_hash") for jd_id, metadata in zip(indexed["ids"], indexed["metadatas"])
+    }
+    changed = [job for job in jobs if indexed_hashes.get(job["jd_id"]) != hashes[job["jd_id"]]]
+    if changed:
+        collection.upsert(
+            ids=[job["jd_id"] for job in changed],
+            documents=[documents[job["jd_id"]] for job in changed],
+            metadatas=[
+                {"jd_id": job["jd_id"], "title": job["title"], "profile_hash": hashes[job["jd_id"]]} for job in changed
+            ]
+        )
+    return len(changed)
+
+
+def shortlist_jobs(
+    collection,
+    resume_text: str,
+    top_k: int = DEFAULT_TOP_K_JOBS,
+    jd_ids: Optional[List[str]] = None
+) -> List[Dict]:
+    """Return the top_k job profiles closest to a resume, optionally restricted to the given job ids
+
+    Each item has the keys "jd_id", "title" and "similarity", ordered from most
+    to least similar.
+    """
+    if top_k <= 0 or collection.count() == 0 or jd_ids == []:
+        return []
+
+    where = {"jd_id": {"$in": list(jd_ids)}} if jd_ids is not None else None
+
+    results = collection.query(
+        query_texts=[resume_text],
+        n_results=min(top_k, collection.count()),
+        where=where,
+        include=["metadatas", "distances"]
+    )
+    return [
+        {"jd_id": jd_id, "title": metadata.get("title", jd_id), "similarity": 1.0 - distance}
+        for jd_id, metadata, distance in zip(results["ids"][0], results["metadatas"][0], results["distances"][0])
+    ]
@@ -0,0 +1,235 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# Nominal H1B cap season (month, day). USCIS announces the exact registration dates each year.
+CAP_REGISTRATION_START = (3, 1)
+CAP_REGISTRATION_END = (3, 25)
+CAP_PETITION_FILING_START = (4, 1)
+CAP_PETITION_FILING_END = (6, 30)
+CAP_EMPLOYMENT_START = (10, 1)
+
+# Days F1 students may remain in the US after their OPT / STEM OPT ends
+OPT_GRACE_PERIOD_DAYS = 60
+# A STEM OPT extension can be filed up to 90 days before the OPT EAD expires
+STEM_OPT_FILING_WINDOW_DAYS = 90
+STEM_OPT_EXTENSION_MONTHS = 24
+STEM_OPT_UNEMPLOYMENT_LIMIT_DAYS = 150
+# H1B extensions can be filed up to six months before the current petition expires
+H1B_EXTENSION_FILING_WINDOW_DAYS = 180
+
+STRONG_MATCH_THRESHOLD = 80
+MINIMUM_MATCH_THRESHOLD = 65
+
+# Top-level response sections that need no LLM input at all
+RULE_ONLY_SECTIONS = ["stem_qualification"]
+
+DATE_FORMAT = "%Y-%m-%d"
+NOT_PROVIDED = "Not provided"
+
+
+def _format(date: Optional[datetime]) -> str:
+    return date.strftime(DATE_FORMAT) if date else NOT_PROVIDED
+
+
+def get_cap_season(today: datetime) -> Dict[str, datetime]:
+    """Key dates of the next H1B cap season whose registration has not yet closed"""
+    year = today.year
+    if today.date() > datetime(year, *CAP_REGISTRATION_END).date():
+        year += 1
+    return {
+        "registration_start": datetime(year, *CAP_REGISTRATION_START),
+        "registration_end": datetime(year, *CAP_REGISTRATION_END),
+        "petition_filing_start": datetime(year, *CAP_PETITION_FILING_START),
+        "petition_filing_end": datetime(year, *CAP_PETITION_FILING_END),
+        "employment_start": datetime(year, *CAP_EMPLOYMENT_START)
+    }
+
+
+def get_status_valid_until(visa_status: str, visa_end_date: Optional[datetime]) -> Optional[datetime]:
+    """Last day the candidate can lawfully remain in their current status, including any grace period"""
+    if visa_end_date is None:
+        return None
+    if visa_status in ("F1 - OPT", "STEM OPT"):
+        return visa_end_date + timedelta(days=OPT_GRACE_PERIOD_DAYS)
+    return visa_end_date
+
+
+def match_risk_level(match_percentage: float) -> str:
+    """Map the resume-JD match percentage onto the LOW/MEDIUM/HIGH H1B risk scale"""
+    if match_percentage >= STRONG_MATCH_THRESHOLD:
+        return "LOW"
+    elif match_percentage >= MINIMUM_MATCH_THRESHOLD:
+        return "MEDIUM"
+    return "HIGH"
+
+
+def assess_visa_timing(
+    visa_status: str,
+    visa_end_date: Optional[datetime],
+    today: Optional[datetime] = None
+) -> Dict:
+    """Score how well the current status lines up with the next H1B cap season"""
+    today = today or datetime.now()
+    season = get_cap_season(today)
+    valid_until = get_status_valid_until(visa_status, visa_end_date)
+    risks: List[str] = []
+
+    if visa_status == "H1B":
+        days_remaining = (visa_end_date - today).days if visa_end_date else None
+        if days_remaining is None:
+            score = 70
+            analysis = "Already in H1B status; a change of employer can be filed as a cap-exempt transfer."
+        elif days_remaining >= 365:
+            score = 90
+            analysis = f"H1B status is valid for {days_remaining} more days; a cap-exempt transfer can be filed at any time."
+        elif days_remaining >= H1B_EXTENSION_FILING_WINDOW_DAYS:
+            score = 70
+            analysis = f"H1B status expires in {days_remaining} days; plan the transfer together with an extension."
+            risks.append("H1B expires within a year; the new petition should also request an extension")
+        else:
+            score = 40
+            analysis = f"H1B status expires in {days_remaining} days; a transfer and extension must be filed promptly."
+            risks.append("H1B expires within six months; file the transfer and extension immediately")
+    elif valid_until is None:
+        score = 60
+        analysis = (
+            "No status end date provided; eligibility for the cap season registering "
+            f"{_format(season['registration_start'])} depends on remaining F1 and OPT time."
+        )
+        risks.append("Status end date unknown; confirm OPT eligibility before the cap registration period")
+    elif valid_until >= season["employment_start"]:
+        score = 90
+        analysis = (
+            f"Status (including grace period) remains valid through {_format(valid_until)}, "
+            f"covering the {_format(season['employment_start'])} H1B start date."
+        )
+    elif valid_until >= season["petition_filing_start"]:
+        score = 70
+        analysis = (
+            f"Status remains valid through {_format(valid_until)}, past the petition filing start on "
+            f"{_format(season['petition_filing_start'])}; a cap-gap extension can bridge to the H1B start date."
+        )
+        risks.append("Relies on a timely filed H1B petition and cap-gap extension to stay in status")
+    elif valid_until >= season["registration_end"]:
+        score = 40
+        analysis = (
+            f"Status ends {_format(valid_until)}, shortly after registration closes; "
+            "the petition must be filed before status lapses."
+        )
+        risks.append("Status may lapse before the H1B petition is filed")
+    else:
+        score = 15
+        analysis = (
+            f"Status ends {_format(valid_until)}, before the next cap registration closes on "
+            f"{_format(season['registration_end'])}."
+        )
+        risks.append("Current status ends before the next H1B cap registration")
+
+    if visa_status == "F1 - OPT" and visa_end_date and (visa_end_date - today).days < 90:
+        risks.append("OPT expires in under 90 days")
+
+    return {
+        "score": score,
+        "analysis": analysis,
+        "key_dates": {
+            "h1b_window_start": _format(season["registration_start"]),
+            "h1b_window_end": _format(season["petition_filing_end"]),
+            "registration_end": _format(season["registration_end"]),
+            "employment_start": _format(season["employment_start"])
+        },
+        "risks": risks
+    }
+
+
+def get_upcoming_deadlines(
+    visa_status: str,
+    is_stem_degree: bool,
+    visa_end_date: Optional[datetime],
+    today: Optional[datetime] = None
+) -> Dict[str, str]:
+    """Deterministic deadlines shown in the Timeline Analysis tab"""
+    today = today or datetime.now()
+    season = get_cap_season(today)
+    deadlines = {
+        "next_h1b_registration": f"{_format(season['registration_start'])} to {_format(season['registration_end'])}",
+        "next_h1b_filing": f"{_format(season['petition_filing_start'])} to {_format(season['petition_filing_end'])}",
+        "h1b_employment_start": _format(season["employment_start"]),
+        "current_status_expiry": _format(visa_end_date)
+    }
+    if visa_status in ("F1 - OPT", "STEM OPT") and visa_end_date:
+        deadlines["grace_period_end"] = _format(get_status_valid_until(visa_status, visa_end_date))
+    if visa_status == "F1 - OPT" and is_stem_degree and visa_end_date:
+        window_opens = visa_end_date - timedelta(days=STEM_OPT_FILING_WINDOW_DAYS)
+        deadlines["stem_opt_extension_filing"] = f"{_format(window_opens)} to {_format(visa_end_date)}"
+    if visa_status == "H1B" and visa_end_date:
+        deadlines["h1b_extension_filing_opens"] = _format(visa_end_date - timedelta(days=H1B_EXTENSION_FILING_WINDOW_DAYS))
+    return deadlines
+
+
+def assess_stem_qualification(visa_status: str, is_stem_degree: bool) -> Dict:
+    """STEM OPT eligibility, benefits and recommendations"""
+    eligible = is_stem_degree and visa_status in ("F1", "F1 - OPT", "STEM OPT")
+    benefits: List[str] = []
+    recommendations: List[str] = []
+
+    if eligible:
+        benefits = [
+            f"{STEM_OPT_EXTENSION_MONTHS}-month STEM OPT extension on top of the initial 12 months of OPT",
+            "Up to three H1B cap lottery attempts before work authorization ends",
+            "Cap-gap extension keeps work authorization between OPT expiry and the H1B start date"
+        ]
+    if visa_status in ("F1", "F1 - OPT") and eligible:
+        recommendations.append(
+            f"File the STEM OPT extension (Form I-765) within {STEM_OPT_FILING_WINDOW_DAYS} days before OPT expires"
+        )
+        recommendations.append("Confirm the employer is enrolled in E-Verify and prepare the Form I-983 training plan")
+    if visa_status == "STEM OPT":
+        recommendations.append(
+            f"Track unemployment days; STEM OPT allows at most {STEM_OPT_UNEMPLOYMENT_LIMIT_DAYS} in total"
+        )
+        recommendations.append("Register in every H1B lottery that falls within the STEM OPT period")
+    if not is_stem_degree and visa_status in ("F1", "F1 - OPT"):
+        recommendations.append("Without a STEM degree only 12 months of OPT are available; register in the next H1B lottery")
+    if visa_status == "H1B":
+        recommendations.append("STEM OPT does not apply to current H1B holders")
+
+    return {
+        "eligible_for_stem_opt": eligible,
+        "benefits": benefits,
+        "recommendations": recommendations
+    }
+
+
+def evaluate_rule_sections(
+    visa_status: str,
+    is_stem_degree: bool,
+    visa_end_date: Optional[datetime],
+    match_percentage: float,
+    today: Optional[datetime] = None
+) -> Dict:
+    """All rule-derived parts of the eligibility analysis, shaped like the LLM response"""
+    today = today or datetime.now()
+    return {
+        "eligibility_factors": {
+            "job_match_assessment": {
+                "score": match_percentage,
+                "risk_level": match_risk_level(match_percentage)
+            },
+            "visa_timing": assess_visa_timing(visa_status, visa_end_date, today)
+        },
+        "stem_qualification": assess_stem_qualification(visa_status, is_stem_degree),
+        "timeline_assessment": {
+            "upcoming_deadlines": get_upcoming_deadlines(visa_status, is_stem_degree, visa_end_date, today)
+        }
+    }
+
+
+def merge_rule_sections(base: Dict, rule_sections: Dict) -> Dict:
+    """Recursively overlay rule-derived values onto an LLM-generated section"""
+    merged = dict(base) if isinstance(base, dict) else {}
+    for key, value in rule_sections.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_rule_sections(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
@@ -0,0 +1,891 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from batch import call_with_retry
+from candidate_store import DEFAULT_STORE_PATH, CandidateStore
+from compaction import (
+    JD_TOKEN_BUDGET, RESUME_TOKEN_BUDGET, TRANSCRIPT_TOKEN_BUDGET, compact_document, log_compaction
+)
+from llm_json import Field, describe_schema, extract_json, validate
+from llm_replay import DEFAULT_RECORDING_PATH, LLM_MODES, RecordingClient, ReplayClient, request_clock
+from metrics import metrics
+from result_cache import DEFAULT_CACHE_PATH, ResultCache, make_cache_key
+from rules import DATE_FORMAT, RULE_ONLY_SECTIONS, evaluate_rule_sections, get_cap_season, merge_rule_sections
+from streaming_json import iter_json_object_items
+
+MODEL_NAME = "gpt-3.5-turbo"
+# Bump these whenever the corresponding prompt changes so stale cached results are not reused
+JD_PROFILE_PROMPT_VERSION = "2"
+MATCH_PROMPT_VERSION = "4"
+ELIGIBILITY_PROMPT_VERSION = "5"
+
+# Resumes at most this long (after compaction) can share a match request with others
+PACK_MAX_RESUME_TOKENS = 1000
+PACK_MAX_CANDIDATES = 4
+PACK_TOKEN_BUDGET = 4000
+# Compacted resumes kept in memory, so fan-out and packing compact each resume only once
+COMPACTED_RESUME_CACHE_SIZE = 256
+
+# System prompts contain only static instructions; all per-request content goes in later messages
+# so that requests share the longest possible prefix for provider-side prompt caching
+JD_PROFILE_SYSTEM_PROMPT = """You are an expert technical recruiter building a requirement profile from a job description. List every concrete skill, tool, qualification and experience requirement, keep each item short, and separate hard requirements from preferences.
+
+Provide a JSON response with:
+1. Job title and seniority level
+2. Required skills and qualifications
+3. Preferred (nice-to-have) skills
+4. Required education level
+5. Industry
+6. One-sentence role summary
+
+Format:
+{
+    "job_title": string,
+    "seniority": string,
+    "required_skills": list,
+    "preferred_skills": list,
+    "required_education": string,
+    "industry": string,
+    "role_summary": string
+}
+
+Always respond with ONLY a valid JSON object matching the specified structure."""
+
+MATCH_SYSTEM_PROMPT = """You are an expert ATS system analyzer. Please assess the alignment between the skills in my resume and the job description. If specific skills do not directly match the job requirements, evaluate their relevance by checking if they fall under broader, related categories that still align with the role's core competencies. For example, skills in machine learning (ML) may fall under computer science (CS) and thus may be relevant for certain CS roles even if ML isn't specifically mentioned.  Apply a flexible but balanced approach in your analysis, where related skills under larger domains or fields should receive consideration, while still prioritizing direct matches to the job description requirements.
+
+Analyze the match between each resume and the job requirements. Provide a JSON response with:
+1. Match percentage (0-100)
+2. Matching skills and qualifications
+3. Missing requirements
+4. Job title and level match
+5. Industry alignment
+
+Format:
+{
+    "match_percentage": number,
+    "matching_skills": list,
+    "missing_requirements": list,
+    "job_title_match": boolean,
+    "industry_alignment": string
+}
+
+If several resumes are given, each labelled with a Candidate ID, assess every resume independently and respond with a JSON array containing one object per resume, in the order given, each with an added "candidate_id" field set to that resume's Candidate ID."""
+
+ELIGIBILITY_SYSTEM_PROMPT = """You are an expert H1B visa analyst. 
+Consider both candidate qualifications and job match for H1B eligibility.
+A strong job match (>65%) significantly improves H1B chances.
+Missing job requirements or poor skill match increases H1B denial risk.
+A person with criminal history is mostly likely not going to get H1B. many more supporting would be required to assess the crime.
+
+Please analyze the H1B visa eligibility based on the provided information. 
+Consider both the candidate's qualifications and the job match analysis.
+
+Consider these factors in your analysis:
+1. If match percentage is below 65%, this indicates higher risk for H1B approval
+2. Missing requirements could affect specialty occupation qualification
+3. Education alignment is crucial for H1B qualification
+4. Industry alignment affects specialty occupation determination
+
+Return a JSON object with the following structure:
+{
+    "eligibility_factors": {
+        "education_qualification": {
+            "score": <number 0-100>,
+            "analysis": <string explaining education match considering both transcript and job requirements>,
+            "risks": [<string>]
+        },
+        "job_match_assessment": {
+            "critical_gaps": [<string>],
+            "impact_on_h1b": <string explaining how job match affects H1B chances>
+        },
+        "background_check": {
+            "status": <string>,
+            "concerns": [<string>],
+            "impact": <string>
+        }
+    },
+    "specialty_occupation_assessment": {
+        "qualifies": <boolean>,
+        "supporting_factors": [<string>],
+        "risk_factors": [<string>],
+        "job_skill_alignment": <string explaining how matching/missing skills affect specialty occupation qualification>
+    },
+    "timeline_assessment": {
+        "immediate_actions": [<string>],
+        "contingency_plans": [<string>]
+    },
+    "overall_assessment": {
+        "eligible": <boolean>,
+        "confidence_score": <number 0-100, heavily weighted by job match percentage>,
+        "risk_level": <string: "LOW"|"MEDIUM"|"HIGH">,
+        "key_concerns": [<string>],
+        "recommendations": [<string>]
+    }
+}
+
+Always respond with ONLY a valid JSON object matching the specified structure."""
+
+# Expected shape of each response, used to fill defaults and decide which sections need repair
+JD_PROFILE_SCHEMA = {
+    "job_title": Field(str, ""),
+    "seniority": Field(str, ""),
+    "required_skills": Field(list, [], required=True),
+    "preferred_skills": Field(list, []),
+    "required_education": Field(str, ""),
+    "industry": Field(str, ""),
+    "role_summary": Field(str, "")
+}
+
+MATCH_SCHEMA = {
+    "match_percentage": Field(int, None, required=True),
+    "matching_skills": Field(list, []),
+    "missing_requirements": Field(list, []),
+    "job_title_match": Field(bool, False),
+    "industry_alignment": Field(str, "")
+}
+
+ELIGIBILITY_SCHEMA = {
+    "eligibility_factors": {
+        "education_qualification": {
+            "score": Field(int, None, required=True),
+            "analysis": Field(str, ""),
+            "risks": Field(list, [])
+        },
+        "job_match_assessment": {
+            "critical_gaps": Field(list, []),
+            "impact_on_h1b": Field(str, "")
+        },
+        "background_check": {
+            "status": Field(str, ""),
+            "concerns": Field(list, []),
+            "impact": Field(str, "")
+        }
+    },
+    "specialty_occupation_assessment": {
+        "qualifies": Field(bool, None),
+        "supporting_factors": Field(list, []),
+        "risk_factors": Field(list, []),
+        "job_skill_alignment": Field(str, "")
+    },
+    "timeline_assessment": {
+        "immediate_actions": Field(list, []),
+        "contingency_plans": Field(list, [])
+    },
+    "overall_assessment": {
+        "eligible": Field(bool, None, required=True),
+        "confidence_score": Field(int, None, required=True),
+        "risk_level": Field(str, None, choices=("LOW", "MEDIUM", "HIGH"), required=True),
+        "key_concerns": Field(list, []),
+        "recommendations": Field(list, [])
+    }
+}
+
+REPAIR_PROMPT = """Your previous response was incomplete or invalid for: {keys}.
+Respond with ONLY a valid JSON object containing exactly these keys, with this structure:
+{template}"""
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_options: Dict[str, Any] = {}
+# "record" appends every LLM call to the recording; "replay" serves calls from it instead of the API
+_llm_mode = {
+    "mode": os.environ.get("H1B_LLM_MODE", "live"),
+    "path": os.environ.get("H1B_LLM_RECORDING", DEFAULT_RECORDING_PATH),
+    "latency_scale": float(os.environ.get("H1B_REPLAY_LATENCY", "0"))
+}
+_result_cache: Optional[ResultCache] = None
+_candidate_store: Optional[CandidateStore] = None
+_lock = threading.Lock()
+
+def set_client(client) -> None:
+    """Use an already configured OpenAI client (e.g. one built from Streamlit secrets)"""
+    global _client
+    _client = client
+
+def configure_client(**options) -> None:
+    """Set the OpenAI client options (e.g. api_key) without creating the client yet
+
+    The client is built on the first LLM call and then shared by every caller in
+    the process, so its HTTP connection pool is reused. Changing the options
+    drops the existing client.
+    """
+    global _client, _client_options
+    with _lock:
+        if options != _client_options:
+            _client_options = options
+            _client = None
+
+def configure_llm_mode(mode: str = "live", path: str = DEFAULT_RECORDING_PATH, latency_scale: float = 0.0) -> None:
+    """Call the API ("live"), record each call to path ("record"), or answer calls from path ("replay")
+
+    latency_scale multiplies the recorded latency injected during replay; 0
+    replays at full speed. Changing the mode drops the existing client.
+    """
+    global _client
+    if mode not in LLM_MODES:
+        raise ValueError(f"Unknown LLM mode: {mode}")
+    settings = {"mode": mode, "path": path, "latency_scale": latency_scale}
+    with _lock:
+        if settings != _llm_mode:
+            _llm_mode.update(settings)
+            _client = None
+
+def get_client():
+    """Return the shared OpenAI client, creating it on first use from configure_client or OPENAI_API_KEY
+
+    In replay mode this is a ReplayClient, so no API key or network is needed.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            if _llm_mode["mode"] == "replay":
+                _client = ReplayClient(_llm_mode["path"], _llm_mode["latency_scale"])
+                return _client
+            # Imported lazily so start-up and fully cached runs never pay the import cost
+            from openai import OpenAI
+            _client = OpenAI(**(_client_options or {"api_key": os.environ.get("OPENAI_API_KEY")}))
+            if _llm_mode["mode"] == "record":
+                _client = RecordingClient(_client, _llm_mode["path"])
+        return _client
+
+def start_of_today() -> datetime:
+    """Clock for date-dependent rules and prompts; whole days, so a day's requests are built identically"""
+    return datetime.combine(datetime.now().date(), datetime.min.time())
+
+def get_result_cache() -> ResultCache:
+    """Shared persistent cache for LLM analysis results"""
+    global _result_cache
+    with _lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(os.environ.get("H1B_RESULT_CACHE", DEFAULT_CACHE_PATH))
+        return _result_cache
+
+def get_candidate_store() -> CandidateStore:
+    """Shared persistent store of per-candidate results used for ranking"""
+    global _candidate_store
+    with _lock:
+        if _candidate_store is None:
+            _candidate_store = CandidateStore(os.environ.get("H1B_CANDIDATE_STORE", DEFAULT_STORE_PATH))
+        return _candidate_store
+
+def get_broken_sections(data: Dict, schema: Dict, required: List[str]) -> List[str]:
+    """Top-level keys that are missing from a response or have a required field missing or invalid"""
+    return [
+        key for key in schema
+        if key not in data or any(path == key or path.startswith(f"{key}.") for path in required)
+    ]
+
+def request_repair(call: str, messages: List[Dict], raw: str, schema: Dict, keys: List[str]) -> Dict:
+    """Ask the model to regenerate only the given top-level keys of a broken response
+
+    The original messages are resent unchanged so the request reuses their cached
+    prompt prefix, and only the broken sections are generated again.
+    """
+    repair_messages = list(messages)
+    if raw:
+        repair_messages.append({"role": "assistant", "content": raw})
+    repair_messages.append({"role": "user", "content": REPAIR_PROMPT.format(
+        keys=", ".join(keys),
+        template=describe_schema({key: schema[key] for key in keys})
+    )})
+    with metrics.span("llm_request", call=f"{call}_repair"):
+        response = get_client().chat.completions.create(
+            model=MODEL_NAME,
+            messages=repair_messages,
+            temperature=0.1
+        )
+    metrics.record_usage(f"{call}_repair", getattr(response, "usage", None))
+    try:
+        data = extract_json(response.choices[0].message.content or "")
+    except json.JSONDecodeError:
+        data = None
+    repaired = {key: data[key] for key in keys if key in data} if isinstance(data, dict) else {}
+    metrics.inc("json_repairs_total", call=call, result="ok" if len(repaired) == len(keys) else "failed")
+    return repaired
+
+def parse_llm_json(call: str, content: Optional[str], messages: List[Dict], schema: Dict) -> Dict:
+    """Tolerantly parse and validate a JSON response, repairing broken sections with one small request
+
+    Missing optional fields are filled with defaults. Raises json.JSONDecodeError,
+    with the raw response as doc, if required fields are still missing after the repair.
+    """
+    content = content or ""
+    try:
+        data = extract_json(content)
+    except json.JSONDecodeError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    result, problems, required = validate(data, schema)
+    broken = get_broken_sections(data, schema, required)
+    if broken:
+        logger.warning("%s response has broken sections %s; requesting a repair", call, broken)
+        data.update(request_repair(call, messages, content, schema, broken))
+        result, problems, required = validate(data, schema)
+    if problems:
+        logger.info("%s response fields filled with defaults: %s", call, ", ".join(problems))
+    if required:
+        raise json.JSONDecodeError(f"Response is missing required fields: {', '.join(required)}", content, 0)
+    return result
+
+def build_jd_profile_messages(jd_text: str) -> List[Dict]:
+    """Compact the job description and build the chat messages for extracting its requirement profile"""
+    jd_text, jd_report = compact_document(jd_text, JD_TOKEN_BUDGET, "jd")
+    log_compaction("jd_profile", [jd_report])
+    return [
+        {"role": "system", "content": JD_PROFILE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Job Description:\n{jd_text}"}
+    ]
+
+def request_jd_profile(jd_text: str, cache: Optional[ResultCache] = None) -> Dict:
+    """Extract the structured requirement profile of a job description, raising on failure
+
+    The profile is cached by JD content, so a requisition is analyzed once no
+    matter how many candidates are matched against it.
+    """
+    if cache is None:
+        cache = get_result_cache()
+    cache_key = make_cache_key("jd_profile", MODEL_NAME, JD_PROFILE_PROMPT_VERSION, jd_text=jd_text)
+    with metrics.span("analyze_jd_profile"):
+        cached = cache.get(cache_key)
+        metrics.record_cache("result", hit=cached is not None)
+        if cached is not None:
+            return cached
+
+        with metrics.span("build_prompt", call="jd_profile"):
+            messages = build_jd_profile_messages(jd_text)
+        with metrics.span("llm_request", call="jd_profile"):
+            response = get_client().chat.completions.create(
+                model=MODEL_NAME,
+                messages=messages
+            )
+        metrics.record_usage("jd_profile", getattr(response, "usage", None))
+        with metrics.span("parse_json", call="jd_profile"):
+            result = parse_llm_json("jd_profile", response.choices[0].message.content, messages, JD_PROFILE_SCHEMA)
+        cache.set(cache_key, result)
+        return result
+
+def format_jd_profile(jd_profile: Dict) -> str:
+    """Render a JD requirement profile as the job section of a match prompt"""
+    return f"""Job Requirements:
+- Title: {jd_profile.get('job_title', '')} ({jd_profile.get('seniority', '')})
+- Required Skills: {", ".join(jd_profile.get('required_skills', []))}
+- Preferred Skills: {", ".join(jd_profile.get('preferred_skills', []))}
+- Required Education: {jd_profile.get('required_education', '')}
+- Industry: {jd_profile.get('industry', '')}"""
+
+@lru_cache(maxsize=COMPACTED_RESUME_CACHE_SIZE)
+def compact_resume(resume_text: str) -> Tuple[str, Dict]:
+    """Compact a resume to its token budget; the (text, report) result is shared and must not be modified"""
+    return compact_document(resume_text, RESUME_TOKEN_BUDGET, "resume")
+
+def build_resume_jd_match_messages(resume_text: str, jd_profile: Dict) -> List[Dict]:
+    """Compact the resume and build the chat messages for matching it against a JD requirement profile
+
+    Messages run from most to least stable (static instructions, then the JD,
+    then the resume) so every candidate of a requisition shares the same prefix.
+    """
+    resume_text, resume_report = compact_resume(resume_text)
+    log_compaction("resume_jd_match", [resume_report])
+    return [
+        {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": format_jd_profile(jd_profile)},
+        {"role": "user", "content": f"Resume:\n{resume_text}"}
+    ]
+
+def match_cache_key(resume_text: str, jd_profile: Dict) -> str:
+    return make_cache_key(
+        "resume_jd_match", MODEL_NAME, MATCH_PROMPT_VERSION,
+        resume_text=resume_text, jd_profile=jd_profile
+    )
+
+def add_profile_fields(result: Dict, jd_profile: Dict) -> Dict:
+    """Copy JD-level fields from the profile rather than having them regenerated per candidate"""
+    result["required_education"] = jd_profile.get("required_education", "")
+    result["role_summary"] = jd_profile.get("role_summary", "")
+    return result
+
+def request_resume_jd_match(
+    resume_text: str,
+    jd_text: str,
+    cache: Optional[ResultCache] = None,
+    jd_profile: Optional[Dict] = None
+) -> Dict:
+    """Analyze match between resume and job description, raising on failure
+
+    Pass jd_profile when it is already known to skip the (cached) profile lookup.
+    """
+    if cache is None:
+        cache = get_result_cache()
+    if jd_profile is None:
+        jd_profile = request_jd_profile(jd_text, cache)
+    cache_key = match_cache_key(resume_text, jd_profile)
+    with metrics.span("analyze_resume_jd_match"):
+        cached = cache.get(cache_key)
+        metrics.record_cache("result", hit=cached is not None)
+        if cached is not None:
+            return cached
+
+        # Compaction happens after computing the cache key so the key stays tied to the original documents
+        with metrics.span("build_prompt", call="resume_jd_match"):
+            messages = build_resume_jd_match_messages(resume_text, jd_profile)
+        with metrics.span("llm_request", call="resume_jd_match"):
+            response = get_client().chat.completions.create(
+                model=MODEL_NAME,
+                messages=messages
+            )
+        metrics.record_usage("resume_jd_match", getattr(response, "usage", None))
+        with metrics.span("parse_json", call="resume_jd_match"):
+            result = add_profile_fields(
+                parse_llm_json("resume_jd_match", response.choices[0].message.content, messages, MATCH_SCHEMA),
+                jd_profile
+            )
+        cache.set(cache_key, result)
+        return result
+
+def request_job_match(resume_text: str, job: Dict, cache: Optional[ResultCache] = None) -> Dict:
+    """Match a resume against a stored job, a dict with the job's requirement "profile", raising on failure"""
+    return request_resume_jd_match(resume_text, "", cache, jd_profile=job["profile"])
+
+def pack_resumes(
+    resumes: Dict[str, str],
+    max_candidates: int = PACK_MAX_CANDIDATES,
+    token_budget: int = PACK_TOKEN_BUDGET
+) -> List[Dict[str, str]]:
+    """Group short resumes into packs that fit one match request; long resumes get a pack of their own"""
+    packs: List[Dict[str, str]] = []
+    current: Dict[str, str] = {}
+    current_tokens = 0
+    for candidate, resume_text in resumes.items():
+        tokens = compact_resume(resume_text)[1]["tokens_after"]
+        if tokens > PACK_MAX_RESUME_TOKENS:
+            packs.append({candidate: resume_text})
+            continue
+        if current and (len(current) >= max_candidates or current_tokens + tokens > token_budget):
+            packs.append(current)
+            current, current_tokens = {}, 0
+        current[candidate] = resume_text
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+def build_packed_match_messages(resumes: Dict[str, str], jd_profile: Dict) -> List[Dict]:
+    """Build one match request for several resumes, labelled C1..Cn in the order given
+
+    Uses the same system and JD messages as the single-resume request, so packed
+    and single calls share a cacheable prompt prefix.
+    """
+    sections = []
+    reports = []
+    for i, resume_text in enumerate(resumes.values(), start=1):
+        resume_text, report = compact_resume(resume_text)
+        reports.append(report)
+        sections.append(f"Candidate ID: C{i}\nResume:\n{resume_text}")
+    log_compaction("resume_jd_match_packed", reports)
+    return [
+        {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": format_jd_profile(jd_profile)},
+        {"role": "user", "content": "\n\n".join(sections)}
+    ]
+
+def parse_packed_match_response(content: str, candidate_ids: List[str]) -> Dict[str, Dict]:
+    """Parse the per-candidate results of a packed match response, keyed by candidate id
+
+    Every complete item with a valid match percentage is kept, with defaults
+    for other missing fields, even if the array as a whole is truncated or
+    malformed; candidates without a usable item are left out.
+    """
+    decoder = json.JSONDecoder()
+    results: Dict[str, Dict] = {}
+    position = content.find("{")
+    while position != -1:
+        try:
+            item, end = decoder.raw_decode(content, position)
+        except json.JSONDecodeError:
+            position = content.find("{", position + 1)
+            continue
+        if not isinstance(item, dict) or "candidate_id" not in item:
+            # A wrapper such as {"results": [...]}; look for the items inside it
+            position = content.find("{", position + 1)
+            continue
+        candidate_id = item.pop("candidate_id")
+        item, _, required = validate(item, MATCH_SCHEMA)
+        if candidate_id in candidate_ids and not required:
+            results.setdefault(candidate_id, item)
+        position = content.find("{", end)
+    return results
+
+def request_packed_resume_jd_match(
+    resumes: Dict[str, str],
+    jd_text: str,
+    cache: Optional[ResultCache] = None,
+    jd_profile: Optional[Dict] = None
+) -> Dict[str, Dict]:
+    """Match several resumes against a JD in one LLM call, returning {candidate: analysis}
+
+    Results are cached per candidate under the same keys as request_resume_jd_match.
+    Candidates missing from the packed response are retried one by one, so the
+    result always covers every candidate or raises.
+    """
+    if cache is None:
+        cache = get_result_cache()
+    if jd_profile is None:
+        jd_profile = request_jd_profile(jd_text, cache)
+
+    results = {}
+    pending = {}
+    for candidate, resume_text in resumes.items():
+        cached = cache.get(match_cache_key(resume_text, jd_profile))
+        metrics.record_cache("result", hit=cached is not None)
+        if cached is not None:
+            results[candidate] = cached
+        else:
+            pending[candidate] = resume_text
+
+    if len(pending) > 1:
+        with metrics.span("analyze_resume_jd_match_packed", size=len(pending)):
+            with metrics.span("build_prompt", call="resume_jd_match_packed"):
+                messages = build_packed_match_messages(pending, jd_profile)
+            with metrics.span("llm_request", call="resume_jd_match_packed"):
+                response = get_client().chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=messages
+                )
+            metrics.record_usage("resume_jd_match_packed", getattr(response, "usage", None))
+            ids = {f"C{i}": candidate for i, candidate in enumerate(pending, start=1)}
+            with metrics.span("parse_json", call="resume_jd_match_packed"):
+                items = parse_packed_match_response(response.choices[0].message.content or "", list(ids))
+        for candidate_id, item in items.items():
+            candidate = ids[candidate_id]
+            results[candidate] = add_profile_fields(item, jd_profile)
+            cache.set(match_cache_key(pending.pop(candidate), jd_profile), results[candidate])
+        if pending:
+            metrics.inc("packed_match_fallbacks_total", len(pending))
+            logger.warning("Packed match response missed %d of %d candidates; retrying them one by one", len(pending), len(ids))
+
+    for candidate, resume_text in pending.items():
+        results[candidate] = request_resume_jd_match(resume_text, jd_text, cache, jd_profile)
+    return results
+
+def calculate_visa_timeline(
+    visa_status: str,
+    start_date: datetime,
+    end_date: Optional[datetime],
+    today: Optional[datetime] = None
+) -> Dict:
+    """Calculate visa timeline and key dates"""
+    today = today or datetime.now()
+    # Same cap season as the rule-derived deadlines, so the prompt never carries two different H1B windows
+    season = get_cap_season(today)
+    
+    timeline = {
+        "current_status": visa_status,
+        "days_remaining": None,
+        "needs_immediate_action": False,
+        "next_h1b_registration_start": season["registration_start"].strftime(DATE_FORMAT),
+        "next_h1b_registration_end": season["registration_end"].strftime(DATE_FORMAT),
+        "h1b_employment_start": season["employment_start"].strftime(DATE_FORMAT),
+        "recommended_action": "",
+        "risk_level": "LOW"
+    }
+    
+    if end_date:
+        days_remaining = (end_date - today).days
+        timeline["days_remaining"] = days_remaining
+        
+        # Calculate hiring window consideration
+        hiring_window = timedelta(days=30)
+        effective_deadline = end_date - hiring_window
+        
+        if visa_status == "F1 - OPT":
+            if days_remaining < 90:
+                timeline["risk_level"] = "HIGH"
+                timeline["needs_immediate_action"] = True
+                timeline["recommended_action"] = "Immediate action required - OPT expiring soon"
+        elif visa_status == "STEM OPT":
+            if days_remaining < 180:
+                timeline["risk_level"] = "MEDIUM"
+                timeline["recommended_action"] = "Start preparing for H1B application"
+        elif visa_status == "H1B":
+            if days_remaining < 365:
+                timeline["risk_level"] = "MEDIUM"
+                timeline["recommended_action"] = "Consider H1B extension preparation"
+    
+    return timeline
+
+def build_h1b_eligibility_messages(
+    transcript_text: str,
+    jd_analysis: Dict,
+    visa_status: str,
+    is_stem_degree: bool,
+    timeline: Dict,
+    rule_sections: Dict,
+    criminal_history: Dict
+) -> List[Dict]:
+    """Compact the transcript and build the chat messages for the H1B eligibility analysis"""
+    transcript_text, transcript_report = compact_document(transcript_text, TRANSCRIPT_TOKEN_BUDGET, "transcript")
+    log_compaction("h1b_eligibility", [transcript_report])
+    
+    # The instructions are all in the system prompt; only the inputs vary between requests
+    job_match = f"""Job Match Analysis Summary:
+- Overall Match: {jd_analysis.get('match_percentage', 0)}%
+- Matching Skills: {", ".join(jd_analysis.get('matching_skills', []))}
+- Missing Requirements: {", ".join(jd_analysis.get('missing_requirements', []))}
+- Required Education: {jd_analysis.get('required_education', '')}
+- Industry Alignment: {jd_analysis.get('industry_alignment', '')}"""
+    
+    candidate = f"""Input Information:
+Current Visa Status: {visa_status}
+STEM Degree: {"Yes" if is_stem_degree else "No"}
+Visa Timeline: {json.dumps(timeline)}
+Visa Timing Assessment: {json.dumps(rule_sections["eligibility_factors"]["visa_timing"])}
+Key Deadlines: {json.dumps(rule_sections["timeline_assessment"]["upcoming_deadlines"])}
+Criminal History: {json.dumps(criminal_history)}
+Transcript: {transcript_text}"""
+    
+    return [
+        {"role": "system", "content": ELIGIBILITY_SYSTEM_PROMPT},
+        {"role": "user", "content": job_match},
+        {"role": "user", "content": candidate}
+    ]
+
+def build_h1b_eligibility_request(
+    transcript_text: str,
+    jd_analysis: Dict,
+    visa_status: str,
+    is_stem_degree: bool,
+    visa_start_date: datetime,
+    visa_end_date: Optional[datetime],
+    criminal_history: Dict,
+    today: datetime
+) -> Tuple[Dict, Dict]:
+    """Build the chat completion request and the rule-derived sections of an eligibility analysis as of today"""
+    timeline = calculate_visa_timeline(visa_status, visa_start_date, visa_end_date, today)
+    
+    # Visa timing, deadlines and STEM qualification are rule-derived, so the LLM does not generate them
+    rule_sections = evaluate_rule_sections(
+        visa_status, is_stem_degree, visa_end_date, jd_analysis.get('match_percentage', 0), today
+    )
+    messages = build_h1b_eligibility_messages(
+        transcript_text, jd_analysis, visa_status, is_stem_degree, timeline, rule_sections, criminal_history
+    )
+    request = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "temperature": 0.1,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+    return request, rule_sections
+
+def stream_h1b_eligibility(
+    transcript_text: str,
+    jd_analysis: Dict,
+    visa_status: str,
+    is_stem_degree: bool,
+    visa_start_date: datetime,
+    visa_end_date: Optional[datetime],
+    criminal_history: Dict,
+    cache: Optional[ResultCache] = None
+) -> Iterator[Tuple[str, Any]]:
+    """Stream the H1B eligibility analysis, yielding each top-level section as soon as it is generated"""
+    inputs = (transcript_text, jd_analysis, visa_status, is_stem_degree, visa_start_date, visa_end_date, criminal_history)
+    today = start_of_today()
+    prepared = None
+    if _llm_mode["mode"] == "replay":
+        # Deadlines and days remaining depend on the date, so a recorded request is rebuilt as of the day it was recorded
+        client = get_client()
+        for clock in getattr(client, "clocks", []):
+            request, rule_sections = build_h1b_eligibility_request(*inputs, clock)
+            if client.has(request):
+                today, prepared = clock, (request, rule_sections)
+                break
+    
+    # The timeline depends on today's date, so it is part of the key as well
+    if cache is None:
+        cache = get_result_cache()
+    cache_key = make_cache_key(
+        "h1b_eligibility", MODEL_NAME, ELIGIBILITY_PROMPT_VERSION,
+        transcript_text=transcript_text,
+        jd_analysis=jd_analysis,
+        visa_status=visa_status,
+        is_stem_degree=is_stem_degree,
+        visa_start_date=visa_start_date,
+        visa_end_date=visa_end_date,
+        criminal_history=criminal_history,
+        today=today.date()
+    )
+    # Time spent by the consumer between sections (e.g. rendering) is excluded from the span
+    started = time.perf_counter()
+    paused = 0.0
+    
+    cached = cache.get(cache_key)
+    metrics.record_cache("result", hit=cached is not None)
+    if cached is not None:
+        yield from cached.items()
+        return
+    
+    if prepared is None:
+        with metrics.span("build_prompt", call="h1b_eligibility"):
+            prepared = build_h1b_eligibility_request(*inputs, today)
+    request, rule_sections = prepared
+    messages = request["messages"]
+    
+    # Rule-only sections are ready before the LLM starts generating
+    result = {}
+    for key in RULE_ONLY_SECTIONS:
+        result[key] = rule_sections[key]
+        pause_start = time.perf_counter()
+        yield key, result[key]
+        paused += time.perf_counter() - pause_start
+    
+    with metrics.span("llm_request", call="h1b_eligibility"), request_clock(today):
+        response = get_client().chat.completions.create(**request)
+    
+    raw_chunks = []
+    def iter_content():
+        for chunk in response:
+            if getattr(chunk, "usage", None):
+                metrics.record_usage("h1b_eligibility", chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                raw_chunks.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    
+    def add_section(key, value):
+        value, _, _ = validate({key: value}, {key: ELIGIBILITY_SCHEMA[key]})
+        value = value[key]
+        result[key] = merge_rule_sections(value, rule_sections[key]) if key in rule_sections else value
+        return result[key]
+    
+    # Sections as generated, before defaults are filled, to tell which ones need a repair
+    generated = {}
+    content = iter_content()
+    try:
+        # Stream each section as soon as its LLM part is complete, with the rule-derived values merged in
+        for key, value in iter_json_object_items(content):
+            if key in RULE_ONLY_SECTIONS or key not in ELIGIBILITY_SCHEMA:
+                continue
+            generated[key] = value
+            section = add_section(key, value)
+            pause_start = time.perf_counter()
+            yield key, section
+            paused += time.perf_counter() - pause_start
+    except ValueError:
+        # Malformed or truncated output: recover whatever complete sections the full text still holds
+        for _ in content:
+            pass
+        try:
+            salvaged = extract_json("".join(raw_chunks))
+        except json.JSONDecodeError:
+            salvaged = {}
+        for key, value in (salvaged.items() if isinstance(salvaged, dict) else []):
+            if key in ELIGIBILITY_SCHEMA and key not in generated:
+                generated[key] = value
+                section = add_section(key, value)
+                pause_start = time.perf_counter()
+                yield key, section
+                paused += time.perf_counter() - pause_start
+    
+    # The usage chunk arrives after the closing brace, so read the stream to the end
+    for _ in content:
+        pass
+    
+    raw = "".join(raw_chunks)
+    _, _, required = validate(generated, ELIGIBILITY_SCHEMA)
+    broken = get_broken_sections(generated, ELIGIBILITY_SCHEMA, required)
+    if broken:
+        logger.warning("h1b_eligibility response has broken sections %s; requesting a repair", broken)
+        for key, value in request_repair("h1b_eligibility", messages, raw, ELIGIBILITY_SCHEMA, broken).items():
+            generated[key] = value
+            section = add_section(key, value)
+            pause_start = time.perf_counter()
+            yield key, section
+            paused += time.perf_counter() - pause_start
+        _, _, required = validate(generated, ELIGIBILITY_SCHEMA)
+    if required:
+        # Carry the raw text so callers can show what the model actually returned
+        raise json.JSONDecodeError(f"Response is missing required fields: {', '.join(required)}", raw, 0)
+    
+    for key, value in rule_sections.items():
+        if key not in result:
+            result[key] = value
+            yield key, value
+    
+    cache.set(cache_key, result)
+    metrics.observe("analyze_h1b_eligibility", time.perf_counter() - started - paused)
+
+def request_h1b_eligibility(
+    transcript_text: str,
+    jd_analysis: Dict,
+    visa_status: str,
+    is_stem_degree: bool,
+    visa_start_date: datetime,
+    visa_end_date: Optional[datetime],
+    criminal_history: Dict,
+    cache: Optional[ResultCache] = None
+) -> Dict:
+    """Run the full H1B eligibility analysis and return it as one dict, raising on failure"""
+    return dict(stream_h1b_eligibility(
+        transcript_text,
+        jd_analysis,
+        visa_status,
+        is_stem_degree,
+        visa_start_date,
+        visa_end_date,
+        criminal_history,
+        cache
+    ))
+
+def run_match_job(payload: Dict, report_partial: Callable[[Dict], None]) -> Dict:
+    """Job handler for a resume-JD match; also records the result in the candidate store"""
+    jd_profile = call_with_retry(request_jd_profile, payload["jd_text"])
+    result = call_with_retry(request_resume_jd_match, payload["resume_text"], payload["jd_text"], jd_profile=jd_profile)
+    if payload.get("candidate"):
+        store = get_candidate_store()
+        # Storing the profile makes this job a target for matching resumes across jobs
+        jd_id = store.add_job(payload["jd_text"], payload.get("jd_name") or "Untitled job", profile=jd_profile)
+        store.save_match(jd_id, payload["candidate"], payload["resume_text"], result)
+    return result
+
+def run_eligibility_job(payload: Dict, report_partial: Callable[[Dict], None]) -> Dict:
+    """Job handler for an H1B eligibility analysis, publishing each section as it streams in"""
+    def analyze() -> Dict:
+        sections = {}
+        for key, value in stream_h1b_eligibility(
+            payload["transcript_text"],
+            payload["jd_analysis"],
+            payload["visa_status"],
+            payload["is_stem_degree"],
+            datetime.fromisoformat(payload["visa_start_date"]) if payload.get("visa_start_date") else None,
+            datetime.fromisoformat(payload["visa_end_date"]) if payload.get("visa_end_date") else None,
+            payload["criminal_history"]
+        ):
+            sections[key] = value
+            report_partial(sections)
+        return sections
+
+    result = call_with_retry(analyze)
+    if payload.get("jd_id") and payload.get("candidate"):
+        try:
+            get_candidate_store().save_eligibility(
+                payload["jd_id"], payload["candidate"], result,
+                visa_status=payload["visa_status"], is_stem_degree=payload["is_stem_degree"]
+            )
+        except KeyError:
+            logger.warning("No stored match for %s; eligibility result not added to the leaderboard", payload["candidate"])
+    return result
+
+# Handlers for the background job queue, keyed by job kind
+JOB_HANDLERS = {
+    "resume_jd_match": run_match_job,
+    "h1b_eligibility": run_eligibility_job
+}
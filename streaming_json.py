@@ -0,0 +1,63 @@
+import json
+from typing import Any, Iterable, Iterator, Tuple
+
+from llm_json import loads_tolerant
+
+
+def iter_json_object_items(chunks: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    """Incrementally parse a streamed JSON object, yielding each top-level (key, value) once complete
+
+    Text before the opening brace (such as a ```json fence) is ignored, as is
+    anything after the closing brace. Values with trailing commas or similar
+    slips are parsed leniently. Raises json.JSONDecodeError for a value that
+    cannot be recovered and ValueError if the stream ends before the object closes.
+    """
+    buffer = ""
+    pos = 0
+    depth = 0
+    in_string = False
+    escaped = False
+    key_start = None
+    key = None
+    value_start = None
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+
+        while pos < len(buffer):
+            char = buffer[pos]
+
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+                    if key_start is not None:
+                        key = json.loads(buffer[key_start:pos + 1])
+                        key_start = None
+            elif char == '"':
+                in_string = True
+                if depth == 1 and value_start is None:
+                    key_start = pos
+            elif char in "{[":
+                depth += 1
+            elif char in "}]":
+                depth -= 1
+                if depth == 0:
+                    if value_start is not None:
+                        yield key, loads_tolerant(buffer[value_start:pos])
+                    return
+            elif depth == 1 and char == ":" and value_start is None:
+                value_start = pos + 1
+            elif depth == 1 and char == "," and value_start is not None:
+                yield key, loads_tolerant(buffer[value_start:pos])
+                key = None
+                value_start = None
+
+            pos += 1
+
+    raise ValueError("Response ended before the JSON object was complete")
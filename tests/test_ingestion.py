@@ -0,0 +1,50 @@
+import os
+
+from ingestion import IngestionStore, ingest, iter_source
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_same_name_in_two_sources_stays_separate(tmp_path):
+    store = IngestionStore(str(tmp_path / "ingested.sqlite3"))
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    write(os.path.join(first, "a.txt"), "Python developer")
+    write(os.path.join(second, "a.txt"), "Mechanical engineer")
+    for source in (first, second):
+        ingest(iter_source(source), store, source, workers=1)
+
+    assert dict(store.iter_texts()) == {f"{first}/a.txt": "Python developer", f"{second}/a.txt": "Mechanical engineer"}
+    assert dict(store.iter_texts(second)) == {f"{second}/a.txt": "Mechanical engineer"}
+
+
+def test_documents_removed_from_source_are_pruned(tmp_path):
+    store = IngestionStore(str(tmp_path / "ingested.sqlite3"))
+    folder = str(tmp_path / "resumes")
+    write(os.path.join(folder, "a.txt"), "Python developer")
+    write(os.path.join(folder, "b.txt"), "Data scientist")
+    ingest(iter_source(folder), store, folder, workers=1)
+
+    os.remove(os.path.join(folder, "b.txt"))
+    stats = ingest(iter_source(folder), store, folder, workers=1)
+
+    assert stats == {"ingested": 0, "skipped": 1, "failed": 0, "removed": 1}
+    assert dict(store.iter_texts()) == {f"{folder}/a.txt": "Python developer"}
+
+
+def test_new_documents_are_passed_to_the_index(tmp_path):
+    store = IngestionStore(str(tmp_path / "ingested.sqlite3"))
+    folder = str(tmp_path / "resumes")
+    write(os.path.join(folder, "a.txt"), "Python developer")
+    indexed = {}
+    ingest(iter_source(folder), store, folder, workers=1, index_fn=indexed.update)
+
+    write(os.path.join(folder, "b.txt"), "Data scientist")
+    batches = []
+    ingest(iter_source(folder), store, folder, workers=1, index_fn=lambda batch: batches.append(dict(batch)))
+
+    assert indexed == {f"{folder}/a.txt": "Python developer"}
+    assert batches == [{f"{folder}/b.txt": "Data scientist"}]
@@ -0,0 +1,46 @@
+import time
+
+import job_queue
+from job_queue import DONE, RUNNING, JobQueue, JobWorkerPool
+
+
+def test_stale_attempt_cannot_complete(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("echo", {"value": 1})
+    first = queue.claim()
+    # Simulate the first worker's lease running out while it is still busy
+    queue._conn.execute("UPDATE jobs SET lease_expires_at = 0 WHERE id = ?", (job_id,))
+    queue._conn.commit()
+    second = queue.claim()
+
+    assert second["attempt"] == first["attempt"] + 1
+    assert not queue.complete(job_id, {"from": "first"}, first["attempt"])
+    assert queue.get(job_id)["status"] == RUNNING
+    assert queue.complete(job_id, {"from": "second"}, second["attempt"])
+    assert queue.get(job_id)["result"] == {"from": "second"}
+
+
+def test_heartbeat_keeps_slow_job_leased(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(job_queue, "HEARTBEAT_SECONDS", 0.05)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    calls = []
+
+    def slow_handler(payload, report_partial):
+        calls.append(payload)
+        time.sleep(1.0)
+        return payload
+
+    job_id = queue.submit("slow", {"value": 1})
+    pool = JobWorkerPool(queue, {"slow": slow_handler}, workers=2, poll_interval=0.05).start()
+    try:
+        deadline = time.time() + 5
+        while queue.get(job_id)["status"] != DONE and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        pool.stop(timeout=2)
+
+    job = queue.get(job_id)
+    assert job["status"] == DONE
+    assert job["attempts"] == 1
+    assert len(calls) == 1
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from llm_json import extract_json
+
+
+def test_complete_json_in_fence():
+    assert extract_json('```json\n{"match_percentage": 85}\n```') == {"match_percentage": 85}
+
+
+def test_trailing_commas_are_dropped():
+    assert extract_json('{"skills": ["py", "sql",], "match_percentage": 85,}') == {
+        "skills": ["py", "sql"], "match_percentage": 85
+    }
+
+
+def test_truncated_number_is_dropped():
+    assert extract_json('{"matching_skills": ["py"], "match_percentage": 8') == {"matching_skills": ["py"]}
+
+
+def test_truncated_string_is_dropped():
+    assert extract_json('{"match_percentage": 85, "summary": "Strong candid') == {"match_percentage": 85}
+
+
+def test_truncated_string_in_list_keeps_complete_items():
+    assert extract_json('{"matching_skills": ["python", "sq') == {"matching_skills": ["python"]}
+
+
+def test_truncated_after_complete_string_keeps_it():
+    assert extract_json('{"summary": "Strong candidate"') == {"summary": "Strong candidate"}
+
+
+def test_truncated_inside_nested_object_keeps_complete_fields():
+    text = '{"overall_assessment": {"eligible": true, "risk_level": "LOW"}, "timeline": {"days_remaining": 12'
+    assert extract_json(text) == {"overall_assessment": {"eligible": True, "risk_level": "LOW"}, "timeline": {}}
+
+
+def test_unrecoverable_text_raises():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("no json here")
@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import screening
+from llm_replay import RecordingClient
+from result_cache import ResultCache
+
+ELIGIBILITY = {
+    "eligibility_factors": {"education_qualification": {"score": 80, "analysis": "ok", "risks": []}},
+    "overall_assessment": {"eligible": True, "confidence_score": 70, "risk_level": "LOW",
+                           "key_concerns": [], "recommendations": []}
+}
+
+
+class StreamingCompletions:
+    def create(self, **request):
+        if not request.get("stream"):
+            # Repair requests for the sections left out of ELIGIBILITY
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))], usage=None)
+        text = json.dumps(ELIGIBILITY)
+        return iter([
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 20]))], usage=None)
+            for i in range(0, len(text), 20)
+        ])
+
+
+def request_eligibility(visa_end_date):
+    return screening.request_h1b_eligibility(
+        "MS Computer Science, GPA 3.8",
+        {"match_percentage": 80, "matching_skills": ["python"], "missing_requirements": []},
+        "F1 - OPT",
+        True,
+        datetime(2025, 6, 1),
+        visa_end_date,
+        {"has_history": False, "details": None},
+        cache=ResultCache(":memory:")
+    )
+
+
+def test_replay_rebuilds_each_request_with_its_recorded_date(tmp_path, monkeypatch):
+    recording = str(tmp_path / "recording.jsonl")
+    # One candidate screened on each day; their deadlines and days remaining depend on that day
+    analyses = [(datetime(2026, 3, 2), datetime(2026, 5, 31)), (datetime(2026, 3, 9), datetime(2026, 12, 31))]
+
+    monkeypatch.setattr(screening, "_llm_mode", {"mode": "record", "path": recording, "latency_scale": 0.0})
+    monkeypatch.setattr(
+        screening, "_client",
+        RecordingClient(SimpleNamespace(chat=SimpleNamespace(completions=StreamingCompletions())), recording)
+    )
+    recorded = []
+    for day, visa_end_date in analyses:
+        monkeypatch.setattr(screening, "start_of_today", lambda day=day: day)
+        recorded.append(request_eligibility(visa_end_date))
+    with open(recording, encoding="utf-8") as f:
+        streamed = [entry for entry in map(json.loads, f) if "chunks" in entry]
+    assert [entry["clock"] for entry in streamed] == [day.isoformat() for day, _ in analyses]
+
+    # Replay both later, with the real clock
+    monkeypatch.undo()
+    monkeypatch.setattr(screening, "_llm_mode", {"mode": "replay", "path": recording, "latency_scale": 0.0})
+    monkeypatch.setattr(screening, "_client", None)
+    assert screening.get_client().clocks == sorted((day for day, _ in analyses), reverse=True)
+    for (day, visa_end_date), result in zip(analyses, recorded):
+        assert request_eligibility(visa_end_date) == result
+    assert recorded[0]["eligibility_factors"]["visa_timing"] != recorded[1]["eligibility_factors"]["visa_timing"]
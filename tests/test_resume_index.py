@@ -0,0 +1,56 @@
+import chromadb
+
+from resume_index import get_resume_collection, index_resumes, make_resume_id, shortlist_resumes
+
+
+def test_identical_resumes_are_indexed_once(tmp_path):
+    collection = get_resume_collection(chromadb.PersistentClient(path=str(tmp_path)), "hash")
+    resume = "Python developer with five years of Django and PostgreSQL experience"
+    resume_ids = index_resumes(collection, {
+        "alice.pdf": resume,
+        "alice (1).pdf": resume,
+        "bob.pdf": "Mechanical engineer experienced in CAD and finite element analysis"
+    })
+
+    assert set(resume_ids) == {"alice.pdf", "alice (1).pdf", "bob.pdf"}
+    assert resume_ids["alice.pdf"] == resume_ids["alice (1).pdf"] == make_resume_id(resume)
+    assert collection.count() == 2
+
+    shortlist = shortlist_resumes(collection, "Django developer", top_k=1, resume_ids=list(resume_ids.values()))
+    assert [item["candidate"] for item in shortlist] == ["alice.pdf"]
+
+
+def test_changed_job_profile_is_reindexed(tmp_path):
+    from resume_index import get_job_profile_collection, index_job_profiles, shortlist_jobs
+    from screening import format_jd_profile
+
+    collection = get_job_profile_collection(chromadb.PersistentClient(path=str(tmp_path)), "hash")
+    job = {"jd_id": "jd-1", "title": "Engineer", "profile": {"job_title": "Java Developer", "required_skills": ["java"]}}
+    other = {"jd_id": "jd-2", "title": "Analyst", "profile": {"job_title": "Data Analyst", "required_skills": ["sql"]}}
+
+    assert index_job_profiles(collection, [job, other], format_jd_profile) == 2
+    assert index_job_profiles(collection, [job, other], format_jd_profile) == 0
+
+    job["profile"] = {"job_title": "Python Developer", "required_skills": ["python", "django"]}
+    assert index_job_profiles(collection, [job, other], format_jd_profile) == 1
+    assert collection.get(ids=["jd-1"], include=["documents"])["documents"] == [format_jd_profile(job["profile"])]
+    assert shortlist_jobs(collection, "Python developer, Django", top_k=1)[0]["jd_id"] == "jd-1"
+
+
+def test_already_indexed_resumes_are_not_embedded_again(tmp_path):
+    collection = get_resume_collection(chromadb.PersistentClient(path=str(tmp_path)), "hash")
+    upserted = []
+    upsert = collection.upsert
+
+    def recording_upsert(**kwargs):
+        upserted.append(kwargs["ids"])
+        return upsert(**kwargs)
+
+    collection.upsert = recording_upsert
+    first = {"carol.pdf": "Frontend engineer with React and TypeScript"}
+    index_resumes(collection, first)
+    resume_ids = index_resumes(collection, dict(first, **{"dave.pdf": "Embedded C firmware engineer"}))
+
+    assert upserted == [[resume_ids["carol.pdf"]], [resume_ids["dave.pdf"]]]
+    assert index_resumes(collection, first) == {"carol.pdf": resume_ids["carol.pdf"]}
+    assert len(upserted) == 2
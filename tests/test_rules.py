@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+from rules import (
+    assess_stem_qualification,
+    assess_visa_timing,
+    get_cap_season,
+    get_status_valid_until,
+    get_upcoming_deadlines,
+    match_risk_level
+)
+
+
+@pytest.mark.parametrize("today, season_year", [
+    (datetime(2026, 1, 10), 2026),
+    (datetime(2026, 3, 25), 2026),
+    (datetime(2026, 3, 26), 2027),
+    (datetime(2026, 12, 31), 2027),
+])
+def test_cap_season_rolls_over_after_registration_closes(today, season_year):
+    season = get_cap_season(today)
+    assert season["registration_start"] == datetime(season_year, 3, 1)
+    assert season["registration_end"] == datetime(season_year, 3, 25)
+    assert season["petition_filing_start"] == datetime(season_year, 4, 1)
+    assert season["petition_filing_end"] == datetime(season_year, 6, 30)
+    assert season["employment_start"] == datetime(season_year, 10, 1)
+
+
+@pytest.mark.parametrize("visa_status, valid_until", [
+    ("F1 - OPT", datetime(2026, 7, 30)),
+    ("STEM OPT", datetime(2026, 7, 30)),
+    ("H1B", datetime(2026, 5, 31)),
+    ("F1", datetime(2026, 5, 31)),
+])
+def test_grace_period_only_extends_opt(visa_status, valid_until):
+    assert get_status_valid_until(visa_status, datetime(2026, 5, 31)) == valid_until
+    assert get_status_valid_until(visa_status, None) is None
+
+
+@pytest.mark.parametrize("match_percentage, risk_level", [(80, "LOW"), (79.9, "MEDIUM"), (65, "MEDIUM"), (64, "HIGH")])
+def test_match_risk_thresholds(match_percentage, risk_level):
+    assert match_risk_level(match_percentage) == risk_level
+
+
+@pytest.mark.parametrize("visa_end_date, score", [
+    # The grace period covers the Oct 1 start date
+    (datetime(2026, 8, 15), 90),
+    # Valid past Apr 1 filing start only with the grace period; cap-gap bridges to Oct 1
+    (datetime(2026, 2, 15), 70),
+    # Valid past registration close, but not until filing opens
+    (datetime(2026, 1, 25), 40),
+    (datetime(2025, 12, 31), 15),
+])
+def test_opt_timing_against_cap_season(visa_end_date, score):
+    assert assess_visa_timing("F1 - OPT", visa_end_date, today=datetime(2025, 11, 1))["score"] == score
+
+
+def test_opt_expiring_soon_is_flagged():
+    timing = assess_visa_timing("F1 - OPT", datetime(2026, 1, 15), today=datetime(2025, 11, 1))
+    assert "OPT expires in under 90 days" in timing["risks"]
+
+
+@pytest.mark.parametrize("days_remaining, score", [(None, 70), (400, 90), (365, 90), (364, 70), (180, 70), (179, 40)])
+def test_h1b_extension_windows(days_remaining, score):
+    today = datetime(2026, 1, 1)
+    visa_end_date = datetime.fromordinal(today.toordinal() + days_remaining) if days_remaining is not None else None
+    assert assess_visa_timing("H1B", visa_end_date, today=today)["score"] == score
+
+
+def test_stem_opt_filing_window_and_grace_period_deadlines():
+    deadlines = get_upcoming_deadlines("F1 - OPT", True, datetime(2026, 6, 30), today=datetime(2026, 4, 1))
+    assert deadlines["next_h1b_registration"] == "2027-03-01 to 2027-03-25"
+    assert deadlines["stem_opt_extension_filing"] == "2026-04-01 to 2026-06-30"
+    assert deadlines["grace_period_end"] == "2026-08-29"
+    assert "stem_opt_extension_filing" not in get_upcoming_deadlines(
+        "F1 - OPT", False, datetime(2026, 6, 30), today=datetime(2026, 4, 1)
+    )
+
+
+def test_h1b_extension_filing_opens_six_months_before_expiry():
+    deadlines = get_upcoming_deadlines("H1B", False, datetime(2026, 12, 31), today=datetime(2026, 4, 1))
+    assert deadlines["h1b_extension_filing_opens"] == "2026-07-04"
+    assert "grace_period_end" not in deadlines
+
+
+@pytest.mark.parametrize("visa_status, is_stem_degree, eligible", [
+    ("F1 - OPT", True, True),
+    ("STEM OPT", True, True),
+    ("F1 - OPT", False, False),
+    ("H1B", True, False),
+])
+def test_stem_opt_eligibility(visa_status, is_stem_degree, eligible):
+    assert assess_stem_qualification(visa_status, is_stem_degree)["eligible_for_stem_opt"] is eligible